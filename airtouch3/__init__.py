@@ -1,9 +1,65 @@
+import importlib
+
 from airtouch3.airtouch3 import AirTouch3
 from airtouch3.airtouch3 import AT3Command
+from airtouch3.airtouch3 import AT3CommandResult
 from airtouch3.airtouch3 import AT3CommsStatus
 from airtouch3.airtouch3 import AT3AcUnit
 from airtouch3.airtouch3 import AT3AcMode
 from airtouch3.airtouch3 import AT3AcFanSpeed
 from airtouch3.airtouch3 import AT3Group
 from airtouch3.airtouch3 import AT3GroupMode
-from airtouch3.airtouch3 import AT3TempSensor
\ No newline at end of file
+from airtouch3.airtouch3 import AT3TempSensor
+from airtouch3.airtouch3 import AT3Snapshot
+from airtouch3.retry import AT3CircuitBreaker
+from airtouch3.retry import AT3CircuitState
+from airtouch3.retry import AT3RetryPolicy
+from airtouch3.cache import AT3StateCache
+
+# Everything else is imported the first time its used, a one off status
+# request shouldnt have to load asyncio and every other subsystem
+_LAZY = {
+    "AT3PollScheduler": "airtouch3.scheduler",
+    "AirTouch3Async": "airtouch3.airtouch3async",
+    "AT3StreamOverflow": "airtouch3.airtouch3async",
+    "AT3CallbackDispatcher": "airtouch3.airtouch3async",
+    "AT3CallbackStats": "airtouch3.airtouch3async",
+    "AT3Priority": "airtouch3.airtouch3async",
+    "AT3Gateway": "airtouch3.gateway",
+    "AT3DiscoveredUnit": "airtouch3.discovery",
+    "discover": "airtouch3.discovery",
+    "AT3Simulator": "airtouch3.simulator",
+    "AT3RuntimeAccumulator": "airtouch3.runtime",
+    "AT3History": "airtouch3.history",
+    "AT3SensorHealth": "airtouch3.health",
+    "AT3SensorProblem": "airtouch3.health",
+    "AT3LoadResult": "airtouch3.loadtest",
+    "load_test": "airtouch3.loadtest",
+    "AT3FrameLog": "airtouch3.framelog",
+    "AirTouch3Threaded": "airtouch3.threaded",
+    "AT3Bridge": "airtouch3.bridge",
+    "AT3LocalBroker": "airtouch3.bridge",
+    "AT3Handle": "airtouch3.registry",
+    "AT3Registry": "airtouch3.registry",
+    "connect": "airtouch3.registry",
+    "AT3Connection": "airtouch3.connection",
+    "AT3ConnectionStats": "airtouch3.connection",
+    "AT3Keepalive": "airtouch3.connection",
+    "AT3ZoneBalancer": "airtouch3.balance",
+}
+
+__all__ = [name for name in globals() if name.startswith(("AT3", "AirTouch3"))]
+__all__ += list(_LAZY)
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if not module:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    # Kept as a global, so later lookups dont come back here
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
\ No newline at end of file
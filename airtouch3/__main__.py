@@ -0,0 +1,120 @@
+import argparse
+import sys
+
+def _controller_listen(value):
+    host, sep, listen = value.partition("=")
+    if not sep or not host or not listen:
+        raise argparse.ArgumentTypeError(
+            f"Expected CONTROLLER=LISTEN, got {value}")
+    return host, listen
+
+def _mix(value):
+    from airtouch3.loadtest import OPERATIONS
+    mix = dict()
+    for item in value.split(","):
+        operation, _, weight = item.partition("=")
+        if operation not in OPERATIONS:
+            raise argparse.ArgumentTypeError(
+                f"Unknown operation {operation}, expected one of "
+                f"{', '.join(OPERATIONS)}")
+        try:
+            mix[operation] = float(weight or 1)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Invalid weight {weight}")
+    return mix
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m airtouch3",
+        description="Monitoring and control of Polyaire Air Touch 3 units")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    gateway = commands.add_parser("gateway",
+        help="share one connection to each unit between many local clients")
+    gateway.add_argument("controllers", nargs="+", type=_controller_listen,
+        metavar="CONTROLLER=LISTEN",
+        help="unit address and where to listen, host:port or unix:/path")
+    gateway.add_argument("--poll-interval", type=float, default=5.0,
+        help="seconds between status polls of each unit")
+    gateway.add_argument("--max-age", type=float, default=2.0,
+        help="oldest cached status in seconds returned to clients")
+
+    discover = commands.add_parser("discover",
+        help="scan networks for Air Touch 3 units")
+    discover.add_argument("networks", nargs="+", metavar="CIDR",
+        help="network to scan, eg 192.168.1.0/24")
+    discover.add_argument("--port", type=int, default=8899)
+    discover.add_argument("--timeout", type=float, default=1.0,
+        help="seconds allowed for each address to respond")
+    discover.add_argument("--concurrency", type=int, default=256,
+        help="addresses tried at the same time")
+
+    loadtest = commands.add_parser("loadtest",
+        help="measure request throughput and latency a unit can sustain")
+    loadtest.add_argument("hosts", nargs="*", metavar="HOST")
+    loadtest.add_argument("--port", type=int, default=8899)
+    loadtest.add_argument("--rate", type=float, default=10.0,
+        help="requests per second sent to each host")
+    loadtest.add_argument("--duration", type=float, default=10.0,
+        help="seconds to send requests for")
+    loadtest.add_argument("--clients", type=int, default=1,
+        help="clients per host, requests are shared between them")
+    loadtest.add_argument("--mix", type=_mix, default={"status": 1},
+        help="weighted operations, eg status=8,group=1,ac=1")
+    loadtest.add_argument("--simulator", action="store_true",
+        help="run against a local simulated unit instead of a host")
+
+    run = commands.add_parser("run",
+        help="run a command script against one or more units",
+        description="Commands, one per line: status [--json], "
+            "group N on|off|toggle|up|down, group N mode percent|temperature, "
+            "group N percent P, ac N on|off|toggle|up|down, ac N mode MODE, "
+            "ac N fan SPEED, ac N temp T, sleep SECONDS")
+    run.add_argument("hosts", nargs="+", metavar="HOST")
+    run.add_argument("--port", type=int, default=8899)
+    run.add_argument("-f", "--file", type=argparse.FileType("r"),
+        help="script to run, default is stdin")
+    run.add_argument("-c", "--command", action="append", dest="lines",
+        metavar="COMMAND", help="command to run instead of a script, "
+            "can be given more than once")
+
+    profile = commands.add_parser("profile",
+        help="measure package import time and first request latency")
+    profile.add_argument("host", nargs="?", metavar="HOST",
+        help="unit to time the first status request against")
+    profile.add_argument("--port", type=int, default=8899)
+    profile.add_argument("--runs", type=int, default=5,
+        help="fresh interpreters to time, the best is checked")
+    profile.add_argument("--budget", type=float, default=50.0,
+        help="most milliseconds importing the package may take")
+    profile.add_argument("--simulator", action="store_true",
+        help="time the first request against a local simulated unit")
+
+    args = parser.parse_args(argv)
+
+    # Only import what the command needs, keeps start up quick
+    if args.command == "gateway":
+        from airtouch3.gateway import run_gateway
+        return run_gateway(args.controllers, args.poll_interval, args.max_age)
+    if args.command == "discover":
+        from airtouch3.discovery import run_discover
+        return run_discover(args.networks, args.port, args.timeout,
+                            args.concurrency)
+    if args.command == "loadtest":
+        if not args.hosts and not args.simulator:
+            parser.error("loadtest needs a HOST or --simulator")
+        from airtouch3.loadtest import run_loadtest
+        return run_loadtest(args.hosts, args.port, args.rate, args.duration,
+                            args.clients, args.mix, args.simulator)
+    if args.command == "run":
+        from airtouch3.script import run_scripts
+        lines = args.lines or (args.file or sys.stdin).read().splitlines()
+        return run_scripts(args.hosts, lines, args.port)
+    if args.command == "profile":
+        from airtouch3.profiling import run_profile
+        return run_profile(args.host, args.port, args.runs, args.budget,
+                            args.simulator)
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,39 @@
+import copy
 from enum import Enum
+import json
 import socket
-from typing import Dict
+import struct
+import threading
+import time
+from typing import Dict, List
 
 import airtouch3.constants as const
+from airtouch3.cache import AT3StateCache
 from airtouch3.helper import (
-    calculate_checksum, 
+    build_command,
+    bits_on,
     bit8_in_byte_on, 
-    bit7_in_byte_on
+    bit7_in_byte_on,
+    decode_text,
+    unix_path
 )
+from airtouch3.retry import (
+    AT3CircuitBreaker,
+    AT3CircuitState,
+    AT3RetryPolicy
+)
+
+# Enum names, by value, looked up rather than worked out on every str()
+_AC_MODE_NAMES = ("Auto", "Heat", "Dry", "Fan", "Cool")
+_AC_FAN_SPEED_NAMES = ("Quiet", "Low", "Medium", "High", "Powerful", "Auto")
+_GROUP_MODE_NAMES = ("Temperature Control", "Percent Open", "Invalid")
+_COMMS_STATUS_NAMES = ("Not Connected", "OK", "Error")
+_COMMAND_RESULT_NAMES = ("Acknowledged", "Mismatch", "Timeout")
+
+# Binary snapshots are the raw frame, after a version and the time it was
+# received, the receiver decodes it only if it needs to
+SCHEMA_VERSION = 1
+_FRAME_HEADER = struct.Struct("<Bd")
 
 class AT3AcMode(Enum):
     AUTO = 0
@@ -17,17 +43,7 @@ class AT3AcMode(Enum):
     COOL = 4
 
     def __str__(self):
-        if self == AT3AcMode.AUTO:
-            return "Auto"
-        if self == AT3AcMode.HEAT:
-            return "Heat"
-        if self == AT3AcMode.DRY:
-            return "Dry"
-        if self == AT3AcMode.FAN:
-            return "Fan"
-        if self == AT3AcMode.COOL:
-            return "Cool"
-        return "Unknown"
+        return _AC_MODE_NAMES[self.value]
 
 class AT3AcFanSpeed(Enum):
     QUIET = 0
@@ -38,19 +54,7 @@ class AT3AcFanSpeed(Enum):
     AUTO = 5
 
     def __str__(self):
-        if self == AT3AcFanSpeed.QUIET:
-            return "Quiet"
-        if self == AT3AcFanSpeed.LOW:
-            return "Low"
-        if self == AT3AcFanSpeed.MED:
-            return "Medium"
-        if self == AT3AcFanSpeed.HIGH:
-            return "High"
-        if self == AT3AcFanSpeed.POWER:
-            return "Powerful"
-        if self == AT3AcFanSpeed.AUTO:
-            return "Auto"
-        return "Unknown"
+        return _AC_FAN_SPEED_NAMES[self.value]
 
 class AT3GroupMode(Enum):
     TEMPERATURE = 0
@@ -58,23 +62,32 @@ class AT3GroupMode(Enum):
     INVALID = 2
 
     def __str__(self):
-        if self == AT3GroupMode.TEMPERATURE:
-            return "Temperature Control"
-        if self == AT3GroupMode.PERECENT:
-            return "Percent Open"
-        if self == AT3GroupMode.INVALID:
-            return "Invalid"
-        return "Unknown"
+        return _GROUP_MODE_NAMES[self.value]
+
+# Members by value, decoding looks them up rather than calling the enum
+_AC_MODES = tuple(AT3AcMode)
+_AC_FAN_SPEEDS = tuple(AT3AcFanSpeed)
 
 class AT3CommsStatus(Enum):
     NOT_CONNECTED = 0
     OK = 1
     ERROR = 2
 
+    def __str__(self):
+        return _COMMS_STATUS_NAMES[self.value]
+
 class AT3Command(Enum):
     INCREMENT = 0
     DECREMENT = 1
 
+class AT3CommandResult(Enum):
+    ACK = 0
+    MISMATCH = 1
+    TIMEOUT = 2
+
+    def __str__(self):
+        return _COMMAND_RESULT_NAMES[self.value]
+
 class AT3AcUnit:
     name = "Unknown"
     number = -1
@@ -103,6 +116,12 @@ class AT3AcUnit:
         return self._at3.set_fan_speed_ac_unit(self.number, speed)
     def set_mode(self, mode:AT3AcMode) -> AT3AcMode:
         return self._at3.set_mode_ac_unit(self.number, mode)
+    def to_dict(self) -> dict:
+        return {"number": self.number, "name": self.name,
+                "is_on": self.is_on, "has_error": self.has_error,
+                "mode": str(self.mode), "fan_speed": str(self.fan_speed),
+                "brand": self.brand, "temperature": self.temperature,
+                "temperature_sp": self.temperature_sp}
 
 class AT3Group:
     name = "Unknown"
@@ -112,6 +131,8 @@ class AT3Group:
     open_percent = -1
     temperature = -1
     temperature_sp = -1
+    zones: List[int] = []
+    zone_mask = 0
 
     def __init__(self, name, number, at3object):
         self.name = name
@@ -128,6 +149,13 @@ class AT3Group:
     def position_dec(self) -> int: 
         return self._at3.toggle_position_group(self.number, 
                                                 AT3Command.DECREMENT)
+    def to_dict(self) -> dict:
+        return {"number": self.number, "name": self.name,
+                "is_on": self.is_on, "mode": str(self.mode),
+                "open_percent": self.open_percent,
+                "temperature": self.temperature,
+                "temperature_sp": self.temperature_sp,
+                "zone_mask": self.zone_mask}
 
 class AT3TempSensor:
     name = "Unknown"
@@ -136,6 +164,85 @@ class AT3TempSensor:
     low_battery = False
     def __init__(self, name):
         self.name = name
+    def to_dict(self) -> dict:
+        return {"name": self.name, "temperature": self.temperature,
+                "available": self.available, "low_battery": self.low_battery}
+
+def _state_dict(name, id, time, comms_status, zone_mask, groups, ac_units,
+                    sensors) -> dict:
+    return {"name": name, "id": id, "time": time,
+            "comms_status": str(comms_status), "zone_mask": zone_mask,
+            "groups": [g.to_dict() for g in groups.values()],
+            "ac_units": [ac.to_dict() for ac in ac_units.values()],
+            "sensors": [s.to_dict() for s in sensors.values()]}
+
+def _frame_bytes(response, time) -> bytes:
+    if not response:
+        return b""
+    return _FRAME_HEADER.pack(SCHEMA_VERSION, time) + response
+
+class AT3Snapshot:
+    name = ""
+    id = ""
+    comms_status = AT3CommsStatus.ERROR
+    response: bytes = None
+    time = 0.0
+    zone_mask = 0
+    zone_group: List[int] = [-1] * const.ZONES_LEN
+    groups: Dict[int, AT3Group] = dict()
+    ac_units: Dict[int, AT3AcUnit] = dict()
+    sensors: Dict[str, AT3TempSensor] = dict()
+
+    def __init__(self, at3object):
+        self.name = at3object.name
+        self.id = at3object.id
+        self.comms_status = at3object.comms_status
+        self.response = at3object.last_response
+        self.time = at3object.last_update
+        self.zone_mask = at3object.zone_mask
+        self.zone_group = at3object.zone_group
+
+        # Copies of the entities, so later updates dont change this
+        # snapshot. They still refer back to the air touch object, so
+        # commands can be issued from a snapshot
+        self.groups = {k: copy.copy(v) for k, v in at3object.groups.items()}
+        self.ac_units = {k: copy.copy(v)
+                            for k, v in at3object.ac_units.items()}
+        self.sensors = {k: copy.copy(v) for k, v in at3object.sensors.items()}
+
+    def zones_on(self) -> List[int]:
+        return bits_on(self.zone_mask)
+
+    def changed_zones(self, prev) -> List[int]:
+        prev_mask = getattr(prev, "zone_mask", prev)
+        return bits_on(self.zone_mask ^ prev_mask)
+
+    def to_dict(self) -> dict:
+        return _state_dict(self.name, self.id, self.time, self.comms_status,
+                            self.zone_mask, self.groups, self.ac_units,
+                            self.sensors)
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+    def to_bytes(self) -> bytes:
+        return _frame_bytes(self.response, self.time)
+
+    @classmethod
+    def from_bytes(cls, data) -> "AT3Snapshot":
+
+        # Anything but a whole frame of this version is rejected outright
+        if not data or data[0] != SCHEMA_VERSION:
+            raise ValueError("Unsupported snapshot version")
+        if len(data) != _FRAME_HEADER.size + const.RESPONSE_LEN:
+            raise ValueError(f"Snapshot is {len(data)} bytes, expected "
+                                f"{_FRAME_HEADER.size + const.RESPONSE_LEN}")
+        timestamp = _FRAME_HEADER.unpack_from(data)[1]
+        decoder = AirTouch3("")
+        decoder._process_response(data[_FRAME_HEADER.size:])
+        decoder.comms_status = AT3CommsStatus.OK
+        decoder.last_update = timestamp
+        return cls(decoder)
 
 class AirTouch3:
 
@@ -151,11 +258,49 @@ class AirTouch3:
     groups: Dict[int, AT3Group] = dict()
     ac_units: Dict[int, AT3AcUnit] = dict()
     sensors: Dict[str, AT3TempSensor] = dict()
-
-    def __init__(self, tcp_ip) -> None:
+    last_response: bytes = None
+    last_update = 0.0
+    stale = True
+    zone_mask = 0
+    zone_group: List[int] = [-1] * const.ZONES_LEN
+    _zone_topology: bytes = None
+    _group_zone_masks: List[int] = []
+
+    def __init__(self, tcp_ip, retry_policy: AT3RetryPolicy = None,
+                    circuit_breaker: AT3CircuitBreaker = None,
+                    port: int = None, cache: AT3StateCache = None) -> None:
         self._tcp_ip = tcp_ip
+        if port:
+            self._TCP_PORT = port
         self.comms_status = AT3CommsStatus.NOT_CONNECTED
         self.comms_error = "Connection yet to be Attempted"
+        self._update_callbacks = []
+
+        # Each object has its own entities, more than one unit (or decoder)
+        # can be used at once
+        self.groups = dict()
+        self.ac_units = dict()
+        self.sensors = dict()
+
+        # Each controller gets its own breaker, so one unit being offline
+        # doesnt stop commands to any others
+        self._retry_policy = retry_policy or AT3RetryPolicy()
+        self._circuit_breaker = circuit_breaker or AT3CircuitBreaker()
+
+        # Show the last known status straight away, until the unit answers
+        self._cache = cache
+        if cache:
+            self._load_cache()
+
+    @property
+    def circuit_state(self) -> AT3CircuitState:
+        return self._circuit_breaker.state
+
+    def register_update_callback(self, func) -> None:
+        self._update_callbacks.append(func)
+
+    def unregister_update_callback(self, func) -> None:
+        self._update_callbacks.remove(func)
 
     def update_status(self) -> bool:
 
@@ -280,6 +425,40 @@ class AirTouch3:
         # return status of group
         return self.groups[group].open_percent
     
+    def ensure_group(self, group: int, is_on: bool,
+                        retries=2) -> AT3CommandResult:
+        return self._send_verified(self._expect_group(group, is_on), retries)
+
+    def ensure_group_mode(self, group: int, mode: AT3GroupMode,
+                            retries=2) -> AT3CommandResult:
+        return self._send_verified(self._expect_group_mode(group, mode),
+                                    retries)
+
+    def ensure_position_group(self, group: int, percent: int,
+                                retries=2) -> AT3CommandResult:
+        return self._send_verified(self._expect_position_group(group, 
+                                    percent), retries)
+
+    def ensure_ac_unit(self, acUnit: int, is_on: bool,
+                        retries=2) -> AT3CommandResult:
+        return self._send_verified(self._expect_ac_unit(acUnit, is_on),
+                                    retries)
+
+    def ensure_mode_ac_unit(self, acUnit: int, mode: AT3AcMode,
+                            retries=2) -> AT3CommandResult:
+        return self._send_verified(self._expect_mode_ac_unit(acUnit, mode),
+                                    retries)
+
+    def ensure_fan_speed_ac_unit(self, acUnit: int, speed: AT3AcFanSpeed,
+                                    retries=2) -> AT3CommandResult:
+        return self._send_verified(self._expect_fan_speed_ac_unit(acUnit, 
+                                    speed), retries)
+
+    def ensure_temperature_ac_unit(self, acUnit: int, temperature: int,
+                                    retries=2) -> AT3CommandResult:
+        return self._send_verified(self._expect_temperature_ac_unit(acUnit,
+                                    temperature), retries)
+
     def print_status(self) -> None:
         print(f"System Name: {self.name}")
         print(f"System ID: {self.id}")
@@ -298,35 +477,78 @@ class AirTouch3:
             print(f"Sensor[{s.name}]: {s.temperature}degC; "
                   f"Low Battery: {s.low_battery}")
 
+    def snapshot(self) -> AT3Snapshot:
+        return AT3Snapshot(self)
+
+    def to_dict(self) -> dict:
+        return _state_dict(self.name, self.id, self.last_update,
+                            self.comms_status, self.zone_mask, self.groups,
+                            self.ac_units, self.sensors)
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+    def to_bytes(self) -> bytes:
+        return _frame_bytes(self.last_response, self.last_update)
+
+    def zones_on(self) -> List[int]:
+        return bits_on(self.zone_mask)
+
+    def changed_zones(self, prev) -> List[int]:
+
+        # Previous can be a zone mask, or a snapshot or other air touch
+        prev_mask = getattr(prev, "zone_mask", prev)
+        return bits_on(self.zone_mask ^ prev_mask)
+
+    def refresh_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.update_status, daemon=True)
+        thread.start()
+        return thread
+
     def _process_response(self, response) -> bool:
 
         # No data received, must be a connection error, nothing to do
         # also make sure we recieved a response of length 492 bytes
         if not response or len(response) != const.RESPONSE_LEN:
-            self.comms_status = AT3CommsStatus.ERROR
-            self.comms_status = "Invalid Response Received"
+
+            # Connection errors have already set the status and error,
+            # dont overwrite the reason the connection failed
+            if self.comms_status == AT3CommsStatus.OK:
+                self.comms_status = AT3CommsStatus.ERROR
+                self.comms_error = "Invalid Response Received"
             return False
 
         # Loop through the maximum number of zones
         # these are the dampers themselves, which are "grouped" 
         # into what is usually known as zones
-        zones = []
+        zone_mask = 0
         for z in range(const.ZONES_LEN):
             # MSB is zone on/off (x) and LS three bits are zone 
             # number 0-7 (y) x000_0yyy. Note the zone number for 
             # zones 1-8 is 0-7 and repeats for zones 9-16, ie 0-7
+            # Zone on/off is kept as bit z of a single mask
             byte_value = response[const.DAOF_ZONE_STATE+z]
-            zones.append(bit8_in_byte_on(byte_value))
+            if bit8_in_byte_on(byte_value):
+                zone_mask |= 1 << z
+        self.zone_mask = zone_mask
 
         # Loop through all the groups, only load the number 
         # configured in the system
         num_groups = int(response[const.DAOF_GRP_COUNT])
+
+        # Zones in each group only change if the system is re-configured,
+        # only work out the zone/group lookups when they do
+        stt = const.DAOF_GRP_FIRSTZONE
+        end = stt + min(const.GROUPS_LEN, num_groups)
+        if response[stt:end] != self._zone_topology:
+            self._index_zones(bytes(response[stt:end]))
+
         for z in range(min(const.GROUPS_LEN, num_groups)):
 
             # Group names are all fixed character length
             stt = const.DAOF_GRP_NAME + (z * const.GRP_NAME_LEN)
             end = stt + const.GRP_NAME_LEN
-            name = response[stt:end].decode().strip().strip('\x00')
+            name = decode_text(response[stt:end])
 
             # Groups are stored using their number as the index
             # Try and get the group via its number, if non found, add it
@@ -342,7 +564,9 @@ class AirTouch3:
             # the same status, so only need to read the first
             byte_value = response[const.DAOF_GRP_FIRSTZONE+z]
             first_zone = int((byte_value & 0b1111_0000) >> 4)
-            group.is_on = zones[first_zone]    
+            group.is_on = bool(zone_mask & (1 << first_zone))
+            group.zones = bits_on(self._group_zone_masks[z])
+            group.zone_mask = self._group_zone_masks[z]
 
             # Mode of zone is 7th bit, if on then temp control, 
             # else percent position
@@ -370,7 +594,7 @@ class AirTouch3:
             # Names are straight after each other in the config file
             stt = const.DAOF_AC1_NAME + const.AC_NAME_LEN*a
             end = stt + const.AC_NAME_LEN
-            name = response[stt:end].decode().strip().strip('\x00')
+            name = decode_text(response[stt:end])
 
             # AC Units are stored using their number as the index
             # Try and get the group via its number, if non found, add it
@@ -390,13 +614,16 @@ class AirTouch3:
             # otherwise, who cares right?
             acUnit.brand = int(response[const.DAOF_AC1_BRAND+a])
 
-            # Mode at in heat/cool etc in bottom 4 bits
-            byte_value = response[const.DAOF_AC1_MODE+a]
-            acUnit.mode = AT3AcMode(int(byte_value & 0b0000_1111))
+            # Mode at in heat/cool etc in bottom 4 bits, a value we dont
+            # know leaves the last mode as it was
+            byte_value = response[const.DAOF_AC1_MODE+a] & 0b0000_1111
+            if byte_value < len(_AC_MODES):
+                acUnit.mode = _AC_MODES[byte_value]
             
-            # Fan Speed is only bottom 4 bits
-            byte_value = response[const.DAOF_AC1_FAN+a]
-            acUnit.fan_speed = AT3AcFanSpeed(int(byte_value & 0b0000_1111))
+            # Fan Speed is only bottom 4 bits, same again
+            byte_value = response[const.DAOF_AC1_FAN+a] & 0b0000_1111
+            if byte_value < len(_AC_FAN_SPEEDS):
+                acUnit.fan_speed = _AC_FAN_SPEEDS[byte_value]
 
             # Get the temp control mode, but dont do anything with it
             # TODO Not used at the moment, dont know how air touch 3 
@@ -426,7 +653,8 @@ class AirTouch3:
         # If valid group and sensor available (should always be available 
         # because its a TP), set temperature of group
         # assign the temperature to the appropriate group
-        if group_id > 0 and group_id <= num_groups and sensor:
+        if group_id > 0 and group_id <= min(const.GROUPS_LEN, num_groups) \
+                and sensor:
             self.groups[group_id - 1].temperature = sensor.temperature  
 
         # Get the sensors in the system
@@ -437,22 +665,217 @@ class AirTouch3:
         # Load the system name and id
         stt = const.DAOF_SYS_NAME
         end = stt + const.SYS_NAME_LEN
-        self.name = response[stt:end].decode().strip().strip('\x00')
+        self.name = decode_text(response[stt:end])
         stt = const.DAOF_SYS_ID
         end = stt + const.SYS_ID_LEN
-        self.id = response[stt:end].decode().strip().strip('\x00')
+        self.id = decode_text(response[stt:end])
+
+        # Keep the raw frame, so callers can cheaply see if anything changed
+        self.last_response = bytes(response)
+        self.last_update = time.time()
+        self.stale = False
+        if self._cache:
+            self._cache.save(self._tcp_ip, self.id, self.last_response,
+                                self.last_update)
+
+        # Notify all callbacks of new status
+        self._notify_update()
 
         # Successfully processed response
         return True
 
+    def _expect_group(self, group, is_on):
+
+        # Invalid Number given
+        if group < 0 or group >= len(self.groups):
+            return None
+
+        def command():
+            return const.CMD_1_GRP_CTRL, group, const.CMD_4_TOGGLE, 0
+        def check():
+            return self.groups[group].is_on == is_on
+        return command, check, 0
+
+    def _expect_group_mode(self, group, mode):
+
+        # Invalid Number given, or group has no temperature to control
+        if group < 0 or group >= len(self.groups):
+            return None
+        if self.groups[group].temperature == -1:
+            return None
+
+        # Toggle only goes between temperature and percent, never invalid
+        if mode not in (AT3GroupMode.TEMPERATURE, AT3GroupMode.PERECENT):
+            return None
+
+        def command():
+            return const.CMD_1_GRP_CTRL, group, const.CMD_4_TOGGLE, 1
+        def check():
+            return self.groups[group].mode == mode
+        return command, check, 0
+
+    def _expect_position_group(self, group, percent):
+
+        # Invalid Number given, or group is off so position isnt known
+        if group < 0 or group >= len(self.groups):
+            return None
+        if not self.groups[group].is_on:
+            return None
+
+        # Position moves in 5% steps, allow a command per step
+        percent = 5 * round(min(100, max(0, percent)) / 5)
+        steps = abs(percent - self.groups[group].open_percent) // 5
+
+        def command():
+            cmd = const.CMD_4_GRP_POSDEC
+            if self.groups[group].open_percent < percent:
+                cmd = const.CMD_4_GRP_POSINC
+            return const.CMD_1_GRP_CTRL, group, cmd, const.CMD_5_GRP_POS
+        def check():
+            return self.groups[group].open_percent == percent
+        return command, check, steps
+
+    def _expect_ac_unit(self, acUnit, is_on):
+
+        # Invalid Ac Unit was given
+        if acUnit < 0 or acUnit >= len(self.ac_units):
+            return None
+
+        def command():
+            return const.CMD_1_AC_CTRL, acUnit, const.CMD_4_TOGGLE, 0
+        def check():
+            return self.ac_units[acUnit].is_on == is_on
+        return command, check, 0
+
+    def _expect_mode_ac_unit(self, acUnit, mode):
+
+        # Invalid Ac Unit was given
+        if acUnit < 0 or acUnit >= len(self.ac_units):
+            return None
+
+        def command():
+            return const.CMD_1_AC_CTRL, acUnit, const.CMD_4_AC_MODE, mode.value
+        def check():
+            return self.ac_units[acUnit].mode == mode
+        return command, check, 0
+
+    def _expect_fan_speed_ac_unit(self, acUnit, speed):
+
+        # Invalid Ac Unit was given
+        if acUnit < 0 or acUnit >= len(self.ac_units):
+            return None
+
+        def command():
+            return (const.CMD_1_AC_CTRL, acUnit, const.CMD_4_AC_FAN_SPD,
+                        speed.value)
+        def check():
+            return self.ac_units[acUnit].fan_speed == speed
+        return command, check, 0
+
+    def _expect_temperature_ac_unit(self, acUnit, temperature):
+
+        # Invalid Ac Unit was given
+        if acUnit < 0 or acUnit >= len(self.ac_units):
+            return None
+
+        # Setpoint the unit cant reach, it would only be stepped towards
+        # until the retries ran out
+        if not const.AC_TEMP_MIN <= temperature <= const.AC_TEMP_MAX:
+            return None
+
+        # Setpoint moves 1 degree per command, allow a command per step
+        steps = abs(temperature - self.ac_units[acUnit].temperature_sp)
+
+        def command():
+            cmd = const.CMD_4_AC_TEMP_DEC
+            if self.ac_units[acUnit].temperature_sp < temperature:
+                cmd = const.CMD_4_AC_TEMP_INC
+            return const.CMD_1_AC_CTRL, acUnit, cmd, 0
+        def check():
+            return self.ac_units[acUnit].temperature_sp == temperature
+        return command, check, steps
+
+    def _send_verified(self, expect, retries) -> AT3CommandResult:
+        if not expect:
+            return None
+        command, check, steps = expect
+
+        # Toggles are relative, if the status we have already looks right 
+        # (or there is none) read status first rather than risk undoing it
+        refresh = not self.last_response or check()
+        result = AT3CommandResult.TIMEOUT
+        for _ in range(retries + steps + 1):
+            if refresh:
+                if not self.update_status():
+                    result = AT3CommandResult.TIMEOUT
+                    continue
+                if check():
+                    return AT3CommandResult.ACK
+
+            # Every response is a full status, so check it straight away. If
+            # no response, we dont know if it was applied, read status first
+            data = self._send_recieve(*command())
+            if not self._process_response(data):
+                result = AT3CommandResult.TIMEOUT
+                refresh = True
+                continue
+            if check():
+                return AT3CommandResult.ACK
+            result = AT3CommandResult.MISMATCH
+            refresh = False
+        return result
+
+    def _index_zones(self, topology) -> None:
+        zone_group = [-1] * const.ZONES_LEN
+        group_zone_masks = []
+        for g, byte_value in enumerate(topology):
+
+            # First zone in top 4 bits, number of zones in the bottom 4
+            first_zone = (byte_value & 0b1111_0000) >> 4
+            zone_count = max(1, byte_value & 0b0000_1111)
+            mask = 0
+            for z in range(first_zone,
+                            min(const.ZONES_LEN, first_zone + zone_count)):
+                mask |= 1 << z
+                zone_group[z] = g
+            group_zone_masks.append(mask)
+
+        self.zone_group = zone_group
+        self._group_zone_masks = group_zone_masks
+        self._zone_topology = topology
+
+    def _load_cache(self) -> bool:
+        response, timestamp = self._cache.load(self._tcp_ip)
+
+        # Cached status is decoded as normal, then marked as stale with the
+        # time it was received. Cache is left out while loading, so the old
+        # status isnt saved again as new
+        cache, self._cache = self._cache, None
+        try:
+            if not self._process_response(response):
+                return False
+        finally:
+            self._cache = cache
+        self.last_update = timestamp
+        self.stale = True
+        return True
+
+    def _notify_update(self) -> None:
+        for func in self._update_callbacks:
+            func()
+
     def _update_or_add_sensor(self, name, byte_value):
 
         temperature = byte_value & 0b0011_1111     # Bits 0 to 6
         available = bit8_in_byte_on(byte_value)    # Bit 8
         low_battery = bit7_in_byte_on(byte_value)  # Bit 7
 
-        # Nothing to do if not available
+        # Nothing to do if not available, other than marking a sensor we
+        # already know about as gone, its last temperature is kept
         if not available:
+            sensor = self.sensors.get(name)
+            if sensor:
+                sensor.available = False
             return None
 
         # Make sure there is an entry in the dict for the sensor
@@ -471,25 +894,52 @@ class AirTouch3:
         # Should always be much less than this (ref const.RESPONSE_LEN)
         BUFFER_SIZE = 1024
 
-        # Command is 12 bytes, add checksum as 13th
-        rList = [const.CMD_0, byte1, const.CMD_2, 
-                    byte3, byte4, byte5, 0, 0, 0, 0, 0, 0]
-        rChk = calculate_checksum(rList)
-        rList.extend(rChk)
-        arr = bytes(rList)
+        arr = build_command(byte1, byte3, byte4, byte5)
 
-        try:
+        # Controller has failed too many times in a row, fail fast until
+        # the breaker lets a probe through
+        if not self._circuit_breaker.allow():
+            self.comms_status = AT3CommsStatus.NOT_CONNECTED
+            self.comms_error = "Circuit open after repeated failures"
+            return None
+
+        attempt = 0
+        while True:
+            try:
+                data = self._exchange(arr, BUFFER_SIZE)
+                self._circuit_breaker.record_success()
+                self.comms_status = AT3CommsStatus.OK
+                self.comms_error = ""
+                return data
+            except OSError as e:
+                self.comms_status = AT3CommsStatus.NOT_CONNECTED
+                self.comms_error = format(e)
+
+                # Out of retries, or this was the single half open probe.
+                # Only a status request is sent again, a command may have
+                # been acted on even though its response never came back
+                if (attempt >= self._retry_policy.retries or
+                        byte1 != const.CMD_1_STATUS or
+                        self.circuit_state == AT3CircuitState.HALF_OPEN):
+                    self._circuit_breaker.record_failure()
+                    return None
+
+            time.sleep(self._retry_policy.delay(attempt))
+            attempt += 1
+
+    def _exchange(self, arr, buffer_size) -> bytes:
+
+        address = unix_path(self._tcp_ip)
+        if address:
+            s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
             s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            address = (self._tcp_ip, self._TCP_PORT)
+        try:
             s.settimeout(5.0)
-            s.connect((self._tcp_ip, self._TCP_PORT))
+            s.connect(address)
             s.send(arr)
             s.settimeout(20.0)
-            data = s.recv(BUFFER_SIZE)
+            return s.recv(buffer_size)
+        finally:
             s.close()
-            self.comms_status = AT3CommsStatus.OK
-            self.comms_error = ""
-            return data
-        except OSError as e:
-            self.comms_status = AT3CommsStatus.NOT_CONNECTED
-            self.comms_error = format(e)
-            return None
@@ -0,0 +1,649 @@
+import asyncio
+from collections import deque
+import contextvars
+from enum import Enum
+import functools
+import heapq
+import time
+from typing import Dict
+
+import airtouch3.constants as const
+from airtouch3.airtouch3 import (
+    AirTouch3,
+    AT3AcFanSpeed,
+    AT3AcMode,
+    AT3Command,
+    AT3CommandResult,
+    AT3CommsStatus,
+    AT3GroupMode
+)
+from airtouch3.cache import AT3StateCache
+from airtouch3.connection import AT3Connection
+from airtouch3.helper import build_command, unix_path
+from airtouch3.retry import (
+    AT3CircuitBreaker,
+    AT3CircuitState,
+    AT3RetryPolicy
+)
+
+_STREAM_OVERFLOW_NAMES = ("Drop Oldest", "Coalesce Latest")
+
+class AT3StreamOverflow(Enum):
+    DROP_OLDEST = 0
+    COALESCE_LATEST = 1
+
+    def __str__(self):
+        return _STREAM_OVERFLOW_NAMES[self.value]
+
+_PRIORITY_NAMES = ("Interactive", "Background")
+
+class AT3Priority(Enum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+    def __str__(self):
+        return _PRIORITY_NAMES[self.value]
+
+# Status requests made as part of a command, eg by the ensure_ functions,
+# are as urgent as the command itself
+_interactive = contextvars.ContextVar("interactive", default=False)
+
+# Returned to a status request answered by a response that another request
+# got, and already processed, while it was queued
+_SHARED = b"shared"
+
+class _AT3StreamQueue:
+
+    def __init__(self, interval, maxsize,
+                    overflow=AT3StreamOverflow.COALESCE_LATEST) -> None:
+        self.interval = interval
+        self.maxsize = max(1, maxsize)
+        self.overflow = overflow
+        self.dropped = 0
+        self._items = deque()
+        self._ready = asyncio.Event()
+
+    def put(self, item) -> None:
+
+        # Never block the poll loop on a slow consumer, either forget the
+        # oldest queued snapshot, or replace the newest one still queued
+        if len(self._items) >= self.maxsize:
+            self.dropped += 1
+            if self.overflow == AT3StreamOverflow.DROP_OLDEST:
+                self._items.popleft()
+            else:
+                self._items.pop()
+        self._items.append(item)
+        self._ready.set()
+
+    async def get(self):
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._items.popleft()
+
+class AT3CallbackStats:
+    name = ""
+    calls = 0
+    coalesced = 0
+    errors = 0
+    last_error = ""
+    last_time = 0.0
+    max_time = 0.0
+    total_time = 0.0
+
+    def __init__(self, name):
+        self.name = name
+
+    @property
+    def avg_time(self) -> float:
+        return self.total_time / self.calls if self.calls else 0.0
+
+class _AT3Subscriber:
+
+    def __init__(self, id, func, maxsize) -> None:
+        self.id = id
+        self.func = func
+        self.maxsize = maxsize
+        self.stats = AT3CallbackStats(getattr(func, "__qualname__", 
+                                                repr(func)))
+        self.queue = None
+        self.task = None
+
+class AT3CallbackDispatcher:
+
+    def __init__(self, executor=None, maxsize=1) -> None:
+        self.maxsize = maxsize
+        self._executor = executor
+        self._subscribers = []
+        self._next_id = 0
+
+    def register(self, func, maxsize=None) -> int:
+
+        # Names arent unique (lambdas, methods of different objects), each
+        # subscription gets an id to tell them apart
+        self._next_id += 1
+        self._subscribers.append(
+            _AT3Subscriber(self._next_id, func, maxsize or self.maxsize))
+        return self._next_id
+
+    def unregister(self, func) -> None:
+        for sub in self._subscribers:
+            if sub.func == func:
+                self._subscribers.remove(sub)
+                if sub.task:
+                    sub.task.cancel()
+                return
+        raise ValueError(f"Callback not registered {func}")
+
+    def stats(self) -> Dict[int, AT3CallbackStats]:
+        return {sub.id: sub.stats for sub in self._subscribers}
+
+    def dispatch(self, *args) -> None:
+
+        # Only queue up the call here, each subscriber has its own worker
+        # so the caller never waits on a callback. If a subscriber falls
+        # behind, its newest queued call is replaced with the latest
+        for sub in self._subscribers:
+            if not sub.task:
+                sub.queue = _AT3StreamQueue(0, sub.maxsize)
+                sub.task = asyncio.ensure_future(self._run(sub))
+            dropped = sub.queue.dropped
+            sub.queue.put(args)
+            sub.stats.coalesced += sub.queue.dropped - dropped
+
+    async def close(self) -> None:
+        for sub in self._subscribers:
+            if sub.task:
+                sub.task.cancel()
+                sub.task = None
+
+    async def _run(self, sub) -> None:
+        loop = asyncio.get_event_loop()
+        while True:
+            args = await sub.queue.get()
+            start = time.perf_counter()
+            try:
+
+                # Coroutines run in this task, anything else runs on the
+                # executor so a blocking callback cant stall the event loop
+                if asyncio.iscoroutinefunction(sub.func):
+                    await sub.func(*args)
+                else:
+                    await loop.run_in_executor(
+                        self._executor, functools.partial(sub.func, *args))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                sub.stats.errors += 1
+                sub.stats.last_error = format(e)
+
+            elapsed = time.perf_counter() - start
+            sub.stats.calls += 1
+            sub.stats.last_time = elapsed
+            sub.stats.total_time += elapsed
+            sub.stats.max_time = max(sub.stats.max_time, elapsed)
+
+class AirTouch3Async(AirTouch3):
+
+    def __init__(self, tcp_ip, retry_policy: AT3RetryPolicy = None,
+                    circuit_breaker: AT3CircuitBreaker = None,
+                    port: int = None, cache: AT3StateCache = None,
+                    executor=None, deadlines=None,
+                    connection: AT3Connection = None) -> None:
+        self._dispatcher = AT3CallbackDispatcher(executor)
+        self._streams = []
+        super().__init__(tcp_ip, retry_policy, circuit_breaker, port, cache)
+        self._poll_task = None
+
+        # Longest a request can take, queueing included, by priority
+        self.deadlines = {AT3Priority.INTERACTIVE: 10.0,
+                            AT3Priority.BACKGROUND: 20.0}
+        self.deadlines.update(deadlines or {})
+
+        # The Air Touch 3 handles one request at a time, waiting requests
+        # are queued by (priority, order)
+        self._busy = False
+        self._waiters = []
+        self._order = 0
+        self._current = None
+        self._frame_time = 0.0
+
+        # Requests normally get a connection each, given a connection they
+        # share it, and it is checked when idle and rebuilt when it dies
+        self.connection = connection
+        self._liveness_task = None
+
+    def register_update_callback(self, func, maxsize=None) -> int:
+        return self._dispatcher.register(func, maxsize)
+
+    def unregister_update_callback(self, func) -> None:
+        self._dispatcher.unregister(func)
+
+    def callback_stats(self) -> Dict[int, AT3CallbackStats]:
+        return self._dispatcher.stats()
+
+    async def update_status(self) -> bool:
+
+        # Send a command to the Air Touch 3 to read status
+        data = await self._send_recieve(const.CMD_1_STATUS, 0, 0, 0)
+
+        # Process the response, returning valid processing of reponse
+        return self._process_response(data)
+
+    async def toggle_ac_unit(self, acUnit: int) -> bool:
+
+        # Invalid Ac Unit was given
+        if acUnit < 0 or acUnit >= len(self.ac_units):
+            return None
+
+        data = await self._send_recieve(const.CMD_1_AC_CTRL, acUnit,
+                                        const.CMD_4_TOGGLE, 0)
+
+        # Process the response, if fails, return none to indicate error
+        if not self._process_response(data): return None
+
+        # return status of AC Unit
+        return self.ac_units[acUnit].is_on
+
+    async def toggle_temperature_ac_unit(self, acUnit: int,
+                                            direction: AT3Command) -> int:
+
+        # Invalid Ac Unit was given
+        if acUnit < 0 or acUnit >= len(self.ac_units):
+            return None
+
+        cmd = const.CMD_4_AC_TEMP_DEC
+        if direction == AT3Command.INCREMENT:
+            cmd = const.CMD_4_AC_TEMP_INC
+        data = await self._send_recieve(const.CMD_1_AC_CTRL, acUnit, cmd, 0)
+
+        # Process the response, if fails, return none to indicate error
+        if not self._process_response(data): return None
+
+        # return status of AC Unit
+        return self.ac_units[acUnit].temperature_sp
+
+    async def set_fan_speed_ac_unit(self, acUnit: int,
+                                    speed: AT3AcFanSpeed) -> AT3AcFanSpeed:
+
+        # Invalid Ac Unit was given
+        if acUnit < 0 or acUnit >= len(self.ac_units):
+            return None
+
+        data = await self._send_recieve(const.CMD_1_AC_CTRL, acUnit,
+                                        const.CMD_4_AC_FAN_SPD, speed.value)
+
+        # Process the response, if fails, return none to indicate error
+        if not self._process_response(data): return None
+
+        # return status of AC Unit
+        return self.ac_units[acUnit].fan_speed
+
+    async def set_mode_ac_unit(self, acUnit: int, mode: AT3AcMode) -> AT3AcMode:
+
+        # Invalid Ac Unit was given
+        if acUnit < 0 or acUnit >= len(self.ac_units):
+            return None
+
+        data = await self._send_recieve(const.CMD_1_AC_CTRL, acUnit,
+                                        const.CMD_4_AC_MODE, mode.value)
+
+        # Process the response, if fails, return none to indicate error
+        if not self._process_response(data): return None
+
+        # return status of AC Unit
+        return self.ac_units[acUnit].mode
+
+    async def toggle_group(self, group: int) -> bool:
+
+        # Invalid Number given
+        if group < 0 or group >= len(self.groups):
+            return None
+
+        data = await self._send_recieve(const.CMD_1_GRP_CTRL, group,
+                                        const.CMD_4_TOGGLE, 0)
+
+        # Process the response, if fails, return none to indicate error
+        if not self._process_response(data): return None
+
+        # return status of group
+        return self.groups[group].is_on
+
+    async def toggle_group_mode(self, group: int) -> AT3GroupMode:
+
+        # Invalid Number given
+        if group < 0 or group >= len(self.groups):
+            return None
+
+        # Only allow when this group has a temperature
+        if self.groups[group].temperature == -1:
+            return None
+
+        data = await self._send_recieve(const.CMD_1_GRP_CTRL, group,
+                                        const.CMD_4_TOGGLE, 1)
+
+        # Process the response, if fails, return none to indicate error
+        if not self._process_response(data): return None
+
+        # return status of group
+        return self.groups[group].mode
+
+    async def toggle_position_group(self, group: int,
+                                    direction: AT3Command) -> int:
+
+        # Invalid Number given
+        if group < 0 or group >= len(self.groups):
+            return None
+
+        cmd = const.CMD_4_GRP_POSDEC
+        if direction == AT3Command.INCREMENT:
+            cmd = const.CMD_4_GRP_POSINC
+
+        data = await self._send_recieve(const.CMD_1_GRP_CTRL, group, cmd,
+                                        const.CMD_5_GRP_POS)
+
+        # Process the response, if fails, return none to indicate error
+        if not self._process_response(data): return None
+
+        # return status of group
+        return self.groups[group].open_percent
+
+    async def ensure_group(self, group: int, is_on: bool,
+                            retries=2) -> AT3CommandResult:
+        return await self._send_verified(self._expect_group(group, is_on),
+                                            retries)
+
+    async def ensure_group_mode(self, group: int, mode: AT3GroupMode,
+                                retries=2) -> AT3CommandResult:
+        return await self._send_verified(self._expect_group_mode(group, mode),
+                                            retries)
+
+    async def ensure_position_group(self, group: int, percent: int,
+                                    retries=2) -> AT3CommandResult:
+        return await self._send_verified(self._expect_position_group(group,
+                                            percent), retries)
+
+    async def ensure_ac_unit(self, acUnit: int, is_on: bool,
+                                retries=2) -> AT3CommandResult:
+        return await self._send_verified(self._expect_ac_unit(acUnit, is_on),
+                                            retries)
+
+    async def ensure_mode_ac_unit(self, acUnit: int, mode: AT3AcMode,
+                                    retries=2) -> AT3CommandResult:
+        return await self._send_verified(self._expect_mode_ac_unit(acUnit,
+                                            mode), retries)
+
+    async def ensure_fan_speed_ac_unit(self, acUnit: int,
+                                        speed: AT3AcFanSpeed,
+                                        retries=2) -> AT3CommandResult:
+        return await self._send_verified(self._expect_fan_speed_ac_unit(
+                                            acUnit, speed), retries)
+
+    async def ensure_temperature_ac_unit(self, acUnit: int, temperature: int,
+                                            retries=2) -> AT3CommandResult:
+        return await self._send_verified(self._expect_temperature_ac_unit(
+                                            acUnit, temperature), retries)
+
+    async def stream(self, interval=5.0, maxsize=1,
+                        overflow=AT3StreamOverflow.COALESCE_LATEST):
+
+        # Every consumer gets its own queue, but all share the one poll loop
+        queue = _AT3StreamQueue(interval, maxsize, overflow)
+        self._streams.append(queue)
+
+        # Start from the current status if we already have one
+        if self.last_response:
+            queue.put(self.snapshot())
+
+        if not self._poll_task or self._poll_task.done():
+            self._poll_task = asyncio.ensure_future(self._poll())
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._streams.remove(queue)
+            if not self._streams and self._poll_task:
+                self._poll_task.cancel()
+                self._poll_task = None
+
+    def refresh_background(self) -> asyncio.Task:
+        return asyncio.ensure_future(self.update_status())
+
+    async def close(self) -> None:
+        if self._poll_task:
+            self._poll_task.cancel()
+            self._poll_task = None
+        if self._liveness_task:
+            self._liveness_task.cancel()
+            self._liveness_task = None
+        if self.connection:
+            self.connection.close()
+        await self._dispatcher.close()
+
+    def _process_response(self, response) -> bool:
+
+        # Already decoded and passed on to callbacks and streams, doing it
+        # again would send the same status twice and move last_update
+        if response is _SHARED:
+            return True
+        return super()._process_response(response)
+
+    def _notify_update(self) -> None:
+
+        # Callbacks are run by the dispatcher, off the receive path
+        self._dispatcher.dispatch()
+
+        # One snapshot per new status, shared by all the consumers
+        if self._streams:
+            snapshot = self.snapshot()
+            for queue in self._streams:
+                queue.put(snapshot)
+
+    async def _poll(self) -> None:
+        while self._streams:
+            await self.update_status()
+            await asyncio.sleep(min(q.interval for q in self._streams))
+
+    async def _send_verified(self, expect, retries) -> AT3CommandResult:
+        if not expect:
+            return None
+        command, check, steps = expect
+
+        # Same as the sync client, see AirTouch3._send_verified
+        token = _interactive.set(True)
+        try:
+            refresh = not self.last_response or check()
+            result = AT3CommandResult.TIMEOUT
+            for _ in range(retries + steps + 1):
+                if refresh:
+                    if not await self.update_status():
+                        result = AT3CommandResult.TIMEOUT
+                        continue
+                    if check():
+                        return AT3CommandResult.ACK
+
+                data = await self._send_recieve(*command())
+                if not self._process_response(data):
+                    result = AT3CommandResult.TIMEOUT
+                    refresh = True
+                    continue
+                if check():
+                    return AT3CommandResult.ACK
+                result = AT3CommandResult.MISMATCH
+                refresh = False
+            return result
+        finally:
+            _interactive.reset(token)
+
+    async def _send_recieve(self, byte1, byte3, byte4, byte5,
+                            timeout=None) -> bytes:
+
+        arr = build_command(byte1, byte3, byte4, byte5)
+        if byte1 == const.CMD_1_STATUS and not _interactive.get():
+            priority = AT3Priority.BACKGROUND
+        else:
+            priority = AT3Priority.INTERACTIVE
+        queued = time.monotonic()
+        deadline = queued + (timeout or self.deadlines[priority])
+
+        # Controller has failed too many times in a row, fail fast until
+        # the breaker lets a probe through
+        if not self._circuit_breaker.allow():
+            self.comms_status = AT3CommsStatus.NOT_CONNECTED
+            self.comms_error = "Circuit open after repeated failures"
+            return None
+
+        # Only one request gets through while half open, this is it
+        probe = self.circuit_state == AT3CircuitState.HALF_OPEN
+        try:
+            return await self._send_queued(arr, priority, queued, deadline)
+        except BaseException:
+
+            # Cancelled (stream closed, close(), wait_for) or failed some
+            # other way. The probe must still report back or the breaker
+            # would never close again, anything else isnt a unit failure
+            if probe:
+                self._circuit_breaker.record_failure()
+            raise
+
+    async def _send_queued(self, arr, priority, queued, deadline) -> bytes:
+        attempt = 0
+        while True:
+            if not await self._acquire(priority, deadline):
+                self.comms_status = AT3CommsStatus.NOT_CONNECTED
+                self.comms_error = f"{priority} deadline passed while queued"
+                if self.circuit_state == AT3CircuitState.HALF_OPEN:
+                    self._circuit_breaker.record_failure()
+                return None
+            try:
+
+                # Every response is the full status, a status request that
+                # waited behind another request can have its response
+                if (priority == AT3Priority.BACKGROUND
+                        and self._frame_time > queued):
+                    self._circuit_breaker.record_success()
+                    return _SHARED
+
+                exchange = asyncio.ensure_future(
+                    self._exchange(arr, deadline - time.monotonic()))
+                self._current = (priority, exchange)
+                try:
+                    await asyncio.wait({exchange})
+                finally:
+                    self._current = None
+                    exchange.cancel()
+
+                # Preempted by an interactive request, queue up again, its
+                # response will most likely do instead
+                if exchange.cancelled():
+                    continue
+
+                data = exchange.result()
+                if data and len(data) == const.RESPONSE_LEN:
+                    self._frame_time = time.monotonic()
+                self._circuit_breaker.record_success()
+                self.comms_status = AT3CommsStatus.OK
+                self.comms_error = ""
+                return data
+            except (OSError, asyncio.TimeoutError) as e:
+                self.comms_status = AT3CommsStatus.NOT_CONNECTED
+                self.comms_error = format(e) or type(e).__name__
+
+                # Out of retries or time, or this was the single half open
+                # probe. Only a status request is sent again, a command may
+                # have been acted on even though its response never came
+                if (attempt >= self._retry_policy.retries or
+                        arr[1] != const.CMD_1_STATUS or
+                        time.monotonic() >= deadline or
+                        self.circuit_state == AT3CircuitState.HALF_OPEN):
+                    self._circuit_breaker.record_failure()
+                    return None
+            finally:
+                self._release()
+
+            await asyncio.sleep(min(self._retry_policy.delay(attempt),
+                                    max(0.0, deadline - time.monotonic())))
+            attempt += 1
+
+    async def _acquire(self, priority, deadline) -> bool:
+        if not self._busy:
+            self._busy = True
+            return True
+
+        self._order += 1
+        waiter = asyncio.get_event_loop().create_future()
+        heapq.heappush(self._waiters, (priority.value, self._order, waiter))
+
+        # An interactive request doesnt wait out a status poll in flight
+        if (priority == AT3Priority.INTERACTIVE and self._current
+                and self._current[0] == AT3Priority.BACKGROUND):
+            self._current[1].cancel()
+
+        try:
+            await asyncio.wait_for(waiter,
+                                    max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            return False
+        except asyncio.CancelledError:
+
+            # Handed the turn just as this was cancelled, pass it on
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+        return True
+
+    def _release(self) -> None:
+
+        # Straight to the next waiter, so no one can jump in between
+        while self._waiters:
+            waiter = heapq.heappop(self._waiters)[2]
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self._busy = False
+
+    async def _liveness(self) -> None:
+        connection = self.connection
+        while True:
+            await asyncio.sleep(max(0.0,
+                                    connection.idle_check - connection.idle()))
+            if connection.idle() < connection.idle_check:
+                continue
+
+            # Nothing heard for a while, a dead connection only shows up
+            # when something is sent on it. A failed check has already
+            # closed it, try again shortly on a new one
+            connection.stats.liveness_checks += 1
+            data = await self._send_recieve(const.CMD_1_STATUS, 0, 0, 0,
+                                            connection.response_deadline)
+            if not self._process_response(data):
+                connection.stats.liveness_failures += 1
+                await asyncio.sleep(connection.response_deadline)
+
+    async def _exchange(self, arr, timeout=20.0) -> bytes:
+        if self.connection:
+            if not self._liveness_task:
+                self._liveness_task = asyncio.ensure_future(self._liveness())
+            return await self.connection.exchange(self._tcp_ip,
+                                                self._TCP_PORT, arr, timeout)
+
+        start = time.monotonic()
+        path = unix_path(self._tcp_ip)
+        if path:
+            connect = asyncio.open_unix_connection(path)
+        else:
+            connect = asyncio.open_connection(self._tcp_ip, self._TCP_PORT)
+        reader, writer = await asyncio.wait_for(connect, min(5.0, timeout))
+        try:
+            writer.write(arr)
+            await writer.drain()
+            try:
+                return await asyncio.wait_for(
+                    reader.readexactly(const.RESPONSE_LEN),
+                    max(0.0, timeout - (time.monotonic() - start)))
+            except asyncio.IncompleteReadError as e:
+                # Short response, leave it to be rejected when processed
+                return e.partial
+        finally:
+            writer.close()
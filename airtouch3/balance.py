@@ -0,0 +1,125 @@
+import time
+from typing import Dict
+
+from airtouch3.airtouch3 import AT3AcMode, AT3CommandResult, AT3GroupMode
+
+class _AT3GroupLoop:
+    integral = None
+    last_time = None
+
+class AT3ZoneBalancer:
+    kp = 10.0
+    ki = 0.2
+    deadband = 0.5
+    min_percent = 10
+    max_percent = 100
+    max_commands = 20
+    min_interval = 60.0
+    commands = 0
+
+    def __init__(self, at3object, kp=10.0, ki=0.2, deadband=0.5,
+                    min_percent=10, max_percent=100, max_commands=20,
+                    min_interval=60.0, sensors: Dict[int, str] = None) -> None:
+
+        # Gains are percent open per degree of error, and per degree minute
+        self.kp = kp
+        self.ki = ki
+        self.deadband = deadband
+        self.min_percent = min_percent
+        self.max_percent = max_percent
+        self.max_commands = max_commands
+        self.min_interval = min_interval
+        self.commands = 0
+        self._at3 = at3object
+
+        # Groups without a touch pad can be given a sensor, by name
+        self.sensors = dict(sensors or {})
+        self._loops: Dict[int, _AT3GroupLoop] = dict()
+        self._last_run = None
+
+    def temperature(self, group) -> float:
+        sensor = self._at3.sensors.get(self.sensors.get(group.number))
+        if sensor and sensor.available:
+            return sensor.temperature
+        return group.temperature if group.temperature != -1 else None
+
+    def direction(self) -> int:
+
+        # Cooling opens dampers when too warm, heating when too cold, with
+        # nothing running theres nothing to balance
+        for ac in self._at3.ac_units.values():
+            if ac.is_on and ac.mode == AT3AcMode.COOL:
+                return 1
+            if ac.is_on and ac.mode == AT3AcMode.HEAT:
+                return -1
+        return 0
+
+    def targets(self, now=None) -> Dict[int, int]:
+
+        # Every group's new position worked out together, from the status
+        # already read, nothing is sent
+        if now is None:
+            now = time.monotonic()
+        direction = self.direction()
+        targets = {}
+        for group in self._at3.groups.values():
+            temperature = self.temperature(group)
+            if (not direction or not group.is_on or temperature is None
+                    or group.mode != AT3GroupMode.PERECENT):
+                self._loops.pop(group.number, None)
+                continue
+
+            # Integral starts from where the damper is, so taking over a
+            # group doesnt jolt it
+            loop = self._loops.get(group.number)
+            if not loop:
+                loop = self._loops[group.number] = _AT3GroupLoop()
+                loop.integral = float(group.open_percent)
+                loop.last_time = now
+            error = direction * (temperature - group.temperature_sp)
+            minutes = (now - loop.last_time) / 60.0
+            loop.last_time = now
+            if abs(error) <= self.deadband:
+                continue
+
+            # Integral is held inside the output range, it cant wind up
+            # while a damper sits fully open or closed
+            loop.integral = min(self.max_percent, max(self.min_percent,
+                                loop.integral + self.ki * error * minutes))
+            output = loop.integral + self.kp * error
+            output = min(self.max_percent, max(self.min_percent, output))
+            target = 5 * round(output / 5)
+            if target != group.open_percent:
+                targets[group.number] = target
+        return targets
+
+    def step(self, now=None) -> Dict[int, AT3CommandResult]:
+        if now is None:
+            now = time.monotonic()
+
+        # Dampers and rooms take minutes to respond, dont chase them
+        if (self._last_run is not None
+                and now - self._last_run < self.min_interval):
+            return {}
+        self._last_run = now
+        if not self._at3.update_status():
+            return {}
+
+        # Biggest moves first, each 5% is one command, until the budget for
+        # this run is used up, the rest carry on next run
+        results = {}
+        budget = self.max_commands
+        targets = self.targets(now)
+        for number in sorted(targets, key=lambda n: -abs(
+                    targets[n] - self._at3.groups[n].open_percent)):
+            if budget <= 0:
+                break
+            current = self._at3.groups[number].open_percent
+            steps = min(budget, abs(targets[number] - current) // 5)
+            target = current + 5 * steps * (1 if targets[number] > current
+                                                else -1)
+            budget -= steps
+            self.commands += steps
+            results[number] = self._at3.ensure_position_group(number, target,
+                                                                retries=1)
+        return results
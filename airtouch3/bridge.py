@@ -0,0 +1,192 @@
+import asyncio
+import json
+from typing import Dict, List, Tuple
+
+from airtouch3.airtouch3 import AT3AcFanSpeed, AT3AcMode, AT3CommandResult, \
+    AT3GroupMode
+from airtouch3.helper import enum_names
+
+# Set commands can use the display name or the enum name, any case
+_AC_MODES = enum_names(AT3AcMode)
+_AC_FAN_SPEEDS = enum_names(AT3AcFanSpeed)
+_GROUP_MODES = enum_names(AT3GroupMode)
+
+def _bool(payload) -> bool:
+    value = payload.strip().lower()
+    if value in ("true", "on", "1"):
+        return True
+    if value in ("false", "off", "0"):
+        return False
+    raise ValueError(f"Invalid on/off value {payload}")
+
+# Settable fields, as (kind, field): (method, parser)
+_SETTERS = {
+    ("group", "is_on"): ("ensure_group", _bool),
+    ("group", "mode"): ("ensure_group_mode", lambda p: _GROUP_MODES[p.lower()]),
+    ("group", "open_percent"): ("ensure_position_group", int),
+    ("ac", "is_on"): ("ensure_ac_unit", _bool),
+    ("ac", "mode"): ("ensure_mode_ac_unit", lambda p: _AC_MODES[p.lower()]),
+    ("ac", "fan_speed"): ("ensure_fan_speed_ac_unit",
+                            lambda p: _AC_FAN_SPEEDS[p.lower()]),
+    ("ac", "temperature_sp"): ("ensure_temperature_ac_unit", int),
+}
+
+def _matches(pattern, topic) -> bool:
+
+    # MQTT wildcards, + is one level, # is the rest
+    pattern, topic = pattern.split("/"), topic.split("/")
+    for i, level in enumerate(pattern):
+        if level == "#":
+            return True
+        if i >= len(topic) or (level != "+" and level != topic[i]):
+            return False
+    return len(pattern) == len(topic)
+
+class AT3LocalBroker:
+    batches = 0
+    messages = 0
+
+    def __init__(self) -> None:
+
+        # In process stand in for a message bus, keeps the last payload of
+        # every state topic like a retained MQTT message
+        self.retained: Dict[str, str] = dict()
+        self._subscribers = []
+
+    def subscribe(self, pattern, func) -> None:
+        self._subscribers.append((pattern, func))
+        for topic, payload in list(self.retained.items()):
+            if _matches(pattern, topic):
+                func(topic, payload)
+
+    def unsubscribe(self, pattern, func) -> None:
+        self._subscribers.remove((pattern, func))
+
+    def publish(self, topic, payload) -> None:
+        self.publish_batch([(topic, payload)])
+
+    def publish_batch(self, messages: List[Tuple[str, str]]) -> None:
+        self.batches += 1
+        self.messages += len(messages)
+
+        # Set commands (and their errors) are never retained, a later
+        # subscriber would run an old command again
+        for topic, payload in messages:
+            if "set" not in topic.split("/")[-2:]:
+                self.retained[topic] = payload
+        for topic, payload in messages:
+            for pattern, func in list(self._subscribers):
+                if _matches(pattern, topic):
+                    func(topic, payload)
+
+class AT3Bridge:
+    prefix = "airtouch3"
+    published = 0
+    commands = 0
+    command_errors = 0
+
+    def __init__(self, at3object, broker, prefix="airtouch3") -> None:
+        self.at3object = at3object
+        self.broker = broker
+        self.prefix = prefix
+        self._published: Dict[str, str] = dict()
+        self._subscribed = None
+        self._tasks = set()
+
+    def attach(self) -> None:
+        self.at3object.register_update_callback(self.publish)
+        self.publish()
+
+    def detach(self) -> None:
+        self.at3object.unregister_update_callback(self.publish)
+        if self._subscribed:
+            self.broker.unsubscribe(self._subscribed, self._command)
+            self._subscribed = None
+
+    def topics(self) -> Dict[str, str]:
+
+        # Every field of every entity, as topic: payload. Theres no comms
+        # status, publish only runs on a good status so it would always be OK
+        at3 = self.at3object
+        base = f"{self.prefix}/{at3.id}"
+        topics = {f"{base}/name": at3.name}
+        for kind, entities, key in (("group", at3.groups, "number"),
+                                    ("ac", at3.ac_units, "number"),
+                                    ("sensor", at3.sensors, "name")):
+            for entity in entities.values():
+                fields = entity.to_dict()
+                path = f"{base}/{kind}/{fields.pop(key)}"
+                for field, value in fields.items():
+                    topics[f"{path}/{field}"] = (value if isinstance(value,
+                                                    str) else json.dumps(value))
+        return topics
+
+    def publish(self) -> List[Tuple[str, str]]:
+
+        # Nothing is known about the unit yet, not even its id
+        if not self.at3object.id:
+            return []
+
+        # Only fields that changed since they were last published go out,
+        # all in one batch
+        batch = [(topic, payload) for topic, payload in self.topics().items()
+                    if self._published.get(topic) != payload]
+        if batch:
+            self._published.update(batch)
+            self.published += len(batch)
+            self.broker.publish_batch(batch)
+
+        # Set commands are listened for once the id is known
+        if not self._subscribed:
+            self._subscribed = f"{self.prefix}/{self.at3object.id}/+/+/+/set"
+            self.broker.subscribe(self._subscribed, self._command)
+        return batch
+
+    def _command(self, topic, payload) -> None:
+
+        # <prefix>/<id>/<group|ac>/<number>/<field>/set
+        kind, number, field = topic.split("/")[-4:-1]
+        setter = _SETTERS.get((kind, field))
+        self.commands += 1
+        try:
+            if not setter:
+                raise ValueError(f"{kind} {field} cant be set")
+            method, parse = setter
+            result = getattr(self.at3object, method)(int(number),
+                                                        parse(payload))
+        except KeyError:
+            self._error(topic, f"Invalid value {payload}")
+            return
+        except ValueError as e:
+            self._error(topic, format(e))
+            return
+
+        # Async clients return a coroutine, run it on the current loop and
+        # report how it went when its done
+        if asyncio.iscoroutine(result):
+            task = asyncio.ensure_future(result)
+            self._tasks.add(task)
+            task.add_done_callback(lambda t: self._done(topic, t))
+        else:
+            self._result(topic, result)
+
+    def _done(self, topic, task) -> None:
+        self._tasks.discard(task)
+        if task.cancelled():
+            self._error(topic, "Cancelled")
+        elif task.exception():
+            self._error(topic, format(task.exception()) or
+                                type(task.exception()).__name__)
+        else:
+            self._result(topic, task.result())
+
+    def _result(self, topic, result) -> None:
+        if result is None:
+            self._error(topic, f"Command not sent, check the "
+                                f"{topic.split('/')[-4]} number and value")
+        elif result != AT3CommandResult.ACK:
+            self._error(topic, f"Command failed: {result}")
+
+    def _error(self, topic, message) -> None:
+        self.command_errors += 1
+        self.broker.publish(f"{topic}/error", message)
@@ -0,0 +1,101 @@
+import atexit
+import json
+import os
+import threading
+import time
+import weakref
+
+# Anything not yet written goes out when the process exits. Caches are held
+# weakly, one that is no longer used can still be collected
+_caches = weakref.WeakSet()
+
+def _flush_all() -> None:
+    for cache in list(_caches):
+        cache.flush()
+
+atexit.register(_flush_all)
+
+class AT3StateCache:
+    path = ""
+    save_interval = 60.0
+    write_delay = 5.0
+
+    def __init__(self, path, save_interval=60.0, write_delay=5.0) -> None:
+        self.path = path
+        self.save_interval = save_interval
+        self.write_delay = write_delay
+        self._saved = {}
+        self._pending = {}
+        self._timer = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        _caches.add(self)
+
+    def load(self, host_or_id):
+
+        # Entries are kept per system id, with the host last used to reach
+        # it, so a unit can be found by either before it has been contacted
+        with self._write_lock:
+            entries = self._read()
+        with self._lock:
+            entries.update(self._pending)
+        for id, entry in entries.items():
+
+            # A hand edited or foreign file can hold anything, skip it
+            if not isinstance(entry, dict):
+                continue
+            if host_or_id in (id, entry.get("host")):
+                try:
+                    return bytes.fromhex(entry["response"]), entry["time"]
+                except (KeyError, TypeError, ValueError):
+                    return None, 0.0
+        return None, 0.0
+
+    def save(self, host, id, response, timestamp) -> None:
+
+        # Only write when something changed, or the saved time is getting
+        # old, status is polled far more often than it needs to be saved
+        with self._lock:
+            last_response, last_saved = self._saved.get(id, (None, 0.0))
+            if (response == last_response
+                    and time.monotonic() - last_saved < self.save_interval):
+                return
+            self._saved[id] = (response, time.monotonic())
+
+            # This is called as each response is processed, so the file
+            # isnt written here. The latest entry is kept and written a
+            # little later on a background thread, with any others saved
+            self._pending[id] = {"host": host, "time": timestamp,
+                                    "response": response.hex()}
+            if not self._timer:
+                self._timer = threading.Timer(self.write_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return
+
+        with self._write_lock:
+            entries = self._read()
+            entries.update(pending)
+
+            # Write to a temp file and swap, so a crash never leaves half
+            # a cache file behind
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
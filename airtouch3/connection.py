@@ -0,0 +1,117 @@
+import asyncio
+import socket
+import time
+
+import airtouch3.constants as const
+from airtouch3.helper import unix_path
+
+class AT3Keepalive:
+    idle = 5
+    interval = 2
+    count = 3
+
+    def __init__(self, idle=5, interval=2, count=3) -> None:
+
+        # Defaults find a dead peer about idle + interval * count seconds
+        # after it was last heard from
+        self.idle = idle
+        self.interval = interval
+        self.count = count
+
+    def apply(self, sock) -> None:
+        if not sock or sock.family not in (socket.AF_INET, socket.AF_INET6):
+            return
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+        # Not every platform has all of these, set the ones it does
+        for option, value in (("TCP_KEEPIDLE", self.idle),
+                                ("TCP_KEEPALIVE", self.idle),
+                                ("TCP_KEEPINTVL", self.interval),
+                                ("TCP_KEEPCNT", self.count)):
+            if hasattr(socket, option):
+                sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option),
+                                value)
+
+class AT3ConnectionStats:
+    connects = 0
+    disconnects = 0
+    timeouts = 0
+    aborted = 0
+    liveness_checks = 0
+    liveness_failures = 0
+    last_error = ""
+    connected_since = 0.0
+
+class AT3Connection:
+    idle_check = 10.0
+    response_deadline = 3.0
+
+    def __init__(self, keepalive: AT3Keepalive = None, idle_check=10.0,
+                    response_deadline=3.0) -> None:
+        self.keepalive = keepalive or AT3Keepalive()
+        self.idle_check = idle_check
+        self.response_deadline = response_deadline
+        self.stats = AT3ConnectionStats()
+        self._reader = None
+        self._writer = None
+        self._last_heard = time.monotonic()
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    def idle(self) -> float:
+        return time.monotonic() - self._last_heard
+
+    async def exchange(self, host, port, arr, timeout) -> bytes:
+        start = time.monotonic()
+        try:
+            if not self._writer:
+                await self._connect(host, port, min(5.0, timeout))
+            self._writer.write(arr)
+            await self._writer.drain()
+            data = await asyncio.wait_for(
+                self._reader.readexactly(const.RESPONSE_LEN),
+                max(0.0, timeout - (time.monotonic() - start)))
+        except asyncio.IncompleteReadError as e:
+
+            # Unit hung up, the next request connects again
+            self.close("Connection closed by unit")
+            return e.partial
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            self.close("No response before deadline")
+            raise
+        except asyncio.CancelledError:
+
+            # A response may still be on its way, it would be read as the
+            # answer to the next request, so start again on a new connection
+            self.stats.aborted += 1
+            self.close("Request cancelled")
+            raise
+        except OSError as e:
+            self.close(format(e) or type(e).__name__)
+            raise
+        self._last_heard = time.monotonic()
+        return data
+
+    def close(self, reason="Closed") -> None:
+        if not self._writer:
+            return
+        self._writer.close()
+        self._reader = None
+        self._writer = None
+        self.stats.disconnects += 1
+        self.stats.last_error = reason
+        self.stats.connected_since = 0.0
+
+    async def _connect(self, host, port, timeout) -> None:
+        path = unix_path(host)
+        if path:
+            connect = asyncio.open_unix_connection(path)
+        else:
+            connect = asyncio.open_connection(host, port)
+        self._reader, self._writer = await asyncio.wait_for(connect, timeout)
+        self.keepalive.apply(self._writer.get_extra_info("socket"))
+        self.stats.connects += 1
+        self.stats.connected_since = time.time()
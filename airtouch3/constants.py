@@ -7,6 +7,8 @@ GRP_NAME_LEN = 8            # Characters in Group names
 SYS_NAME_LEN = 16           # Characters in System name
 AC_NAME_LEN = 8             # Characters in AC names
 SYS_ID_LEN = 8              # Characters in System ID
+AC_TEMP_MIN = 16            # Lowest AC temperature setpoint in degC
+AC_TEMP_MAX = 30            # Highest AC temperature setpoint in degC
 RESPONSE_LEN = 492          # Response length in bytes from Air Touch 3
 
 # Data Offsets - from start of response
@@ -0,0 +1,74 @@
+import asyncio
+import ipaddress
+from typing import List
+
+import airtouch3.constants as const
+from airtouch3.helper import build_command, decode_text
+
+class AT3DiscoveredUnit:
+    host = ""
+    port = 8899
+    name = ""
+    id = ""
+
+    def __init__(self, host, port, name, id):
+        self.host = host
+        self.port = port
+        self.name = name
+        self.id = id
+
+    def __repr__(self):
+        return f"AT3DiscoveredUnit({self.host}:{self.port}, {self.name}, " \
+               f"{self.id})"
+
+async def probe(host, port=8899, timeout=1.0) -> AT3DiscoveredUnit:
+    try:
+        return await asyncio.wait_for(_probe(host, port), timeout)
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+            UnicodeDecodeError):
+        return None
+
+async def _probe(host, port) -> AT3DiscoveredUnit:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+
+        # Anything listening on the port must answer a status request with
+        # a full length response to be counted as an Air Touch 3
+        writer.write(build_command(const.CMD_1_STATUS, 0, 0, 0))
+        await writer.drain()
+        response = await reader.readexactly(const.RESPONSE_LEN)
+    finally:
+        writer.close()
+
+    stt = const.DAOF_SYS_NAME
+    end = stt + const.SYS_NAME_LEN
+    name = decode_text(response[stt:end])
+    stt = const.DAOF_SYS_ID
+    end = stt + const.SYS_ID_LEN
+    id = decode_text(response[stt:end])
+    return AT3DiscoveredUnit(host, port, name, id)
+
+async def discover(network, port=8899, timeout=1.0,
+                    concurrency=256) -> List[AT3DiscoveredUnit]:
+
+    # Every address is tried at once (up to the concurrency limit), each
+    # with a short deadline, so a /24 takes about one timeout
+    network = ipaddress.ip_network(network, strict=False)
+    hosts = list(network.hosts()) or [network.network_address]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(host):
+        async with semaphore:
+            return await probe(str(host), port, timeout)
+
+    units = await asyncio.gather(*(limited(h) for h in hosts))
+    return [u for u in units if u]
+
+def run_discover(networks, port=8899, timeout=1.0, concurrency=256) -> int:
+    found = 0
+    for network in networks:
+        units = asyncio.run(discover(network, port, timeout, concurrency))
+        for unit in units:
+            print(f"{unit.host}\t{unit.name}\t{unit.id}")
+        found += len(units)
+    return 0 if found else 1
@@ -0,0 +1,168 @@
+from array import array
+from bisect import bisect_right
+import os
+import struct
+import threading
+from typing import Any, Dict, List, Tuple
+
+from airtouch3 import constants as const
+from airtouch3.airtouch3 import AirTouch3, AT3Snapshot
+from airtouch3.helper import AT3Recorder, status_time
+
+# Every record is the time followed by the raw frame, fixed size so record
+# n is always at n * RECORD_LEN
+_TIME = struct.Struct("<d")
+RECORD_LEN = _TIME.size + const.RESPONSE_LEN
+
+class AT3FrameLog(AT3Recorder):
+    path = ""
+    checkpoint_every = 64
+    keepalive = 60.0
+
+    def __init__(self, path, checkpoint_every=64, keepalive=60.0) -> None:
+        self.path = path
+        self.checkpoint_every = checkpoint_every
+        self.keepalive = keepalive
+        self._lock = threading.Lock()
+        self._file = open(path, "a+b")
+
+        # A crash part way through a write leaves a partial record at the
+        # end, drop it so every record stays at its fixed position
+        size = os.path.getsize(path)
+        if size % RECORD_LEN:
+            self._file.truncate(size - size % RECORD_LEN)
+        self._count = size // RECORD_LEN
+
+        # Time of every checkpoint_every'th record, only this is kept in
+        # memory, a search reads one block of records from the file
+        self._index = array('d')
+        for i in range(0, self._count, checkpoint_every):
+            self._index.append(self._read(i, 1)[0][0])
+        self._last_time = None
+        self._last_response = None
+        if self._count:
+            self._last_time, self._last_response = self._read(
+                                                    self._count - 1, 1)[0]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def record(self, source, timestamp=None) -> bool:
+        timestamp = status_time(source, timestamp)
+        if timestamp is None:
+            return False
+        return self.append(source.last_response, timestamp)
+
+    def append(self, response, timestamp) -> bool:
+        if not response or len(response) != const.RESPONSE_LEN:
+            return False
+        with self._lock:
+            if self._last_time is not None and timestamp <= self._last_time:
+                return False
+
+            # Status is polled far more often than it changes, only log
+            # changes, and an unchanged frame now and then so gaps in the
+            # log show when the unit wasnt being heard from
+            if (response == self._last_response
+                    and timestamp - self._last_time < self.keepalive):
+                return False
+
+            self._file.write(_TIME.pack(timestamp) + bytes(response))
+            self._file.flush()
+            if self._count % self.checkpoint_every == 0:
+                self._index.append(timestamp)
+            self._count += 1
+            self._last_time = timestamp
+            self._last_response = bytes(response)
+        return True
+
+    def state_at(self, t) -> AT3Snapshot:
+
+        # Status as it was last received at or before t, None if the log
+        # doesnt go back that far
+        with self._lock:
+            i = self._find(t)
+            if i < 0:
+                return None
+            timestamp, response = self._read(i, 1)[0]
+        decoder = self._decode(AirTouch3(""), response, timestamp)
+        return decoder.snapshot()
+
+    def changes_between(self, t0, t1) -> List[Tuple[float, str, Any, Any]]:
+
+        # Every field that changed after t0 up to and including t1, as
+        # (time, field, old, new), starting from the state at t0
+        decoder = AirTouch3("")
+        changes = []
+        with self._lock:
+            i = self._find(t0)
+            fields = {}
+            prev = None
+            if i >= 0:
+                timestamp, prev = self._read(i, 1)[0]
+                fields = self._fields(self._decode(decoder, prev, timestamp))
+            i += 1
+            while i < self._count:
+                records = self._read(i, self.checkpoint_every)
+                i += len(records)
+                for timestamp, response in records:
+                    if timestamp > t1:
+                        return changes
+
+                    # Keepalive frames dont need decoding
+                    if response == prev:
+                        continue
+                    prev = response
+                    new = self._fields(self._decode(decoder, response,
+                                                    timestamp))
+                    for field, value in new.items():
+                        old = fields.get(field)
+                        if value != old:
+                            changes.append((timestamp, field, old, value))
+                    fields = new
+        return changes
+
+    def _find(self, t) -> int:
+
+        # Last record at or before t, binary search of the checkpoints then
+        # of the one block they point to
+        block = bisect_right(self._index, t) - 1
+        if block < 0:
+            return -1
+        start = block * self.checkpoint_every
+        times = [r[0] for r in self._read(start, self.checkpoint_every)]
+        return start + bisect_right(times, t) - 1
+
+    def _read(self, i, count) -> List[Tuple[float, bytes]]:
+        self._file.seek(i * RECORD_LEN)
+        data = self._file.read(min(count, self._count - i) * RECORD_LEN)
+        records = []
+        for offset in range(0, len(data) - RECORD_LEN + 1, RECORD_LEN):
+            records.append((_TIME.unpack_from(data, offset)[0],
+                            data[offset + _TIME.size:offset + RECORD_LEN]))
+        return records
+
+    def _decode(self, decoder, response, timestamp) -> AirTouch3:
+        decoder._process_response(response)
+        decoder.last_update = timestamp
+        return decoder
+
+    def _fields(self, at3object) -> Dict[str, Any]:
+        fields = {}
+        for group in at3object.groups.values():
+            for field in ("name", "is_on", "mode", "open_percent",
+                            "temperature", "temperature_sp"):
+                fields[f"group/{group.number}/{field}"] = getattr(group, field)
+        for ac in at3object.ac_units.values():
+            for field in ("name", "is_on", "has_error", "mode", "fan_speed",
+                            "temperature", "temperature_sp"):
+                fields[f"ac/{ac.number}/{field}"] = getattr(ac, field)
+        for sensor in at3object.sensors.values():
+            for field in ("available", "low_battery", "temperature"):
+                fields[f"sensor/{sensor.name}/{field}"] = getattr(sensor,
+                                                                    field)
+        return fields
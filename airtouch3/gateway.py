@@ -0,0 +1,196 @@
+import asyncio
+import time
+
+import airtouch3.constants as const
+from airtouch3.airtouch3async import AirTouch3Async
+from airtouch3.connection import AT3Keepalive
+from airtouch3.helper import unix_path, valid_command
+
+# Only these requests are passed on, anything else could upset the unit
+_COMMANDS = (const.CMD_1_STATUS, const.CMD_1_GRP_CTRL, const.CMD_1_AC_CTRL)
+
+class AT3Gateway:
+    poll_interval = 5.0
+    max_age = 2.0
+    clients = 0
+    requests = 0
+    cache_hits = 0
+    commands = 0
+
+    def __init__(self, at3object: AirTouch3Async, poll_interval=5.0,
+                    max_age=2.0, keepalive: AT3Keepalive = None) -> None:
+        self.poll_interval = poll_interval
+        self.max_age = max_age
+
+        # Clients stay connected, one that vanished without closing would
+        # otherwise be waited on forever
+        self.keepalive = keepalive or AT3Keepalive()
+        self._at3 = at3object
+        self._servers = []
+        self._poll_task = None
+        self._refresh_task = None
+        self._command_task = None
+        self._pending = []
+        self._writers = set()
+        self._handlers = set()
+
+    async def start(self, listen) -> None:
+
+        # Listen is "host:port" or "unix:/path", clients talk the same
+        # protocol as the Air Touch 3 itself, so AirTouch3 works unchanged
+        path = unix_path(listen)
+        if path:
+            server = await asyncio.start_unix_server(self._handle, path)
+        else:
+            host, _, port = listen.rpartition(":")
+            server = await asyncio.start_server(self._handle, host or None,
+                                                int(port))
+        self._servers.append(server)
+
+        if not self._poll_task:
+            self._poll_task = asyncio.ensure_future(self._poll())
+
+    async def close(self) -> None:
+        for server in self._servers:
+            server.close()
+
+        # Hang up on connected clients and let their handlers end first,
+        # waiting for the servers to close would otherwise wait on them
+        for writer in list(self._writers):
+            writer.close()
+        for task in list(self._handlers):
+            task.cancel()
+        while self._handlers:
+            await asyncio.sleep(0)
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers = []
+        for task in (self._poll_task, self._command_task):
+            if task:
+                task.cancel()
+        self._poll_task = None
+        self._command_task = None
+        await self._at3.close()
+
+    async def _poll(self) -> None:
+        while True:
+
+            # Commands also refresh the cache, only poll when nothing has
+            # been heard from the unit for a full interval
+            age = time.time() - self._at3.last_update
+            if age >= self.poll_interval and not self._pending:
+                await self._refresh()
+                age = 0.0
+            await asyncio.sleep(max(0.0, self.poll_interval - age))
+
+    async def _refresh(self) -> bool:
+
+        # Everyone needing fresh status waits on the same single request
+        if not self._refresh_task or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(
+                self._at3.update_status())
+        return await asyncio.shield(self._refresh_task)
+
+    async def _status(self) -> bytes:
+        if time.time() - self._at3.last_update <= self.max_age:
+            self.cache_hits += 1
+            return self._at3.last_response
+
+        # An old frame is never passed on as current, if the unit cant be
+        # reached the client is dropped so it sees the failure
+        if not await self._refresh():
+            return None
+        return self._at3.last_response
+
+    async def _command(self, frame) -> bytes:
+        future = asyncio.get_event_loop().create_future()
+        self._pending.append((frame, future))
+        if not self._command_task or self._command_task.done():
+            self._command_task = asyncio.ensure_future(self._run_commands())
+        return await future
+
+    async def _run_commands(self) -> None:
+
+        # Commands are sent one after the other in the order received, any
+        # that arrive while a batch is going are picked up straight after
+        batch = []
+        try:
+            while self._pending:
+                batch, self._pending = self._pending, []
+                for frame, future in batch:
+                    self.commands += 1
+                    response = None
+                    try:
+                        data = await self._at3._send_recieve(frame[1],
+                                                frame[3], frame[4], frame[5])
+                        if self._at3._process_response(data):
+                            response = self._at3.last_response
+                    finally:
+                        if not future.done():
+                            future.set_result(response)
+        finally:
+
+            # Stopped by an error or by close, the rest of the batch and
+            # anything queued since wont be sent. Their clients get no
+            # response and are dropped, rather than waiting forever
+            for _, future in batch + self._pending:
+                if not future.done():
+                    future.set_result(None)
+            self._pending = []
+
+    async def _handle(self, reader, writer) -> None:
+        self.clients += 1
+        self._writers.add(writer)
+        self._handlers.add(asyncio.current_task())
+        self.keepalive.apply(writer.get_extra_info("socket"))
+        try:
+            while True:
+                try:
+                    frame = await reader.readexactly(13)
+                except asyncio.IncompleteReadError:
+                    break
+
+                # Drop clients sending anything unexpected, dont pass it on
+                if not valid_command(frame) or frame[1] not in _COMMANDS:
+                    break
+
+                self.requests += 1
+                if frame[1] == const.CMD_1_STATUS:
+                    response = await self._status()
+                else:
+                    response = await self._command(frame)
+
+                # Unit is unreachable, close so the client sees the failure
+                if not response:
+                    break
+                writer.write(response)
+                await writer.drain()
+
+        # Cancelled by close, nothing waits on the handler to report it
+        except (OSError, asyncio.CancelledError):
+            pass
+        finally:
+            self.clients -= 1
+            self._writers.discard(writer)
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+
+async def _serve(controllers, poll_interval, max_age) -> None:
+    gateways = []
+    for host, listen in controllers:
+        gateway = AT3Gateway(AirTouch3Async(host), poll_interval, max_age)
+        await gateway.start(listen)
+        gateways.append(gateway)
+        print(f"Gateway for {host} listening on {listen}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for gateway in gateways:
+            await gateway.close()
+
+def run_gateway(controllers, poll_interval=5.0, max_age=2.0) -> int:
+    try:
+        asyncio.run(_serve(controllers, poll_interval, max_age))
+    except KeyboardInterrupt:
+        pass
+    return 0
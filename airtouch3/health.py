@@ -0,0 +1,106 @@
+from enum import Enum
+import time
+from typing import Dict, Set
+
+from airtouch3.helper import AT3Recorder, status_time
+
+_SENSOR_PROBLEM_NAMES = ("Offline", "Stale", "Low Battery", "Flatline")
+
+class AT3SensorProblem(Enum):
+    OFFLINE = 0
+    STALE = 1
+    LOW_BATTERY = 2
+    FLATLINE = 3
+
+    def __str__(self):
+        return _SENSOR_PROBLEM_NAMES[self.value]
+
+class _AT3SensorState:
+    last_seen = 0.0
+    temperature = None
+    unchanged_since = 0.0
+    low_battery = False
+
+class AT3SensorHealth(AT3Recorder):
+    stale_after = 300.0
+    flatline_after = 21600.0
+
+    def __init__(self, stale_after=300.0, flatline_after=21600.0) -> None:
+        self.stale_after = stale_after
+        self.flatline_after = flatline_after
+
+        # Only sensors with a problem are in here, changed on transitions
+        self.unhealthy: Dict[str, Set[AT3SensorProblem]] = dict()
+        self._sensors: Dict[str, _AT3SensorState] = dict()
+        self._callbacks = []
+
+    def register_callback(self, func) -> None:
+        self._callbacks.append(func)
+
+    def unregister_callback(self, func) -> None:
+        self._callbacks.remove(func)
+
+    def last_seen(self, name) -> float:
+        state = self._sensors.get(name)
+        return state.last_seen if state else None
+
+    def record(self, source, timestamp=None) -> None:
+        timestamp = status_time(source, timestamp)
+        if timestamp is None:
+            return
+
+        for sensor in source.sensors.values():
+            state = self._sensors.get(sensor.name)
+            if not state:
+                state = self._sensors[sensor.name] = _AT3SensorState()
+                state.unchanged_since = timestamp
+
+            self._set(sensor.name, AT3SensorProblem.OFFLINE,
+                        not sensor.available)
+            if not sensor.available:
+                continue
+            state.last_seen = timestamp
+            self._set(sensor.name, AT3SensorProblem.STALE, False)
+
+            # Battery only raises an event when it changes
+            if sensor.low_battery != state.low_battery:
+                state.low_battery = sensor.low_battery
+                self._set(sensor.name, AT3SensorProblem.LOW_BATTERY,
+                            sensor.low_battery)
+
+            # A real room never holds exactly the same reading for hours
+            if sensor.temperature != state.temperature:
+                state.temperature = sensor.temperature
+                state.unchanged_since = timestamp
+            self._set(sensor.name, AT3SensorProblem.FLATLINE,
+                        timestamp - state.unchanged_since
+                            >= self.flatline_after)
+
+        self.check(timestamp)
+
+    def check(self, now=None) -> None:
+
+        # Sensors not heard from for too long, including when status has
+        # stopped coming at all, so this can also be called on a timer
+        if now is None:
+            now = time.time()
+        for name, state in self._sensors.items():
+            if state.last_seen:
+                self._set(name, AT3SensorProblem.STALE,
+                            now - state.last_seen >= self.stale_after)
+
+    def _set(self, name, problem, active) -> None:
+        problems = self.unhealthy.get(name, set())
+        if (problem in problems) == active:
+            return
+
+        if active:
+            problems.add(problem)
+            self.unhealthy[name] = problems
+        else:
+            problems.discard(problem)
+            if not problems:
+                del self.unhealthy[name]
+
+        for func in self._callbacks:
+            func(name, problem, active)
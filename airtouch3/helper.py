@@ -1,3 +1,5 @@
+import airtouch3.constants as const
+
 def calculate_checksum(message):
     r = 0
     for c in message:
@@ -10,3 +12,71 @@ def bit8_in_byte_on(bin_value):
 
 def bit7_in_byte_on(bin_value):
     return (bin_value & 0b01000000) > 0
+
+def bits_on(mask):
+    # Numbers of the bits that are on, lowest first
+    bits = []
+    while mask:
+        low = mask & -mask
+        bits.append(low.bit_length() - 1)
+        mask ^= low
+    return bits
+
+def build_command(byte1, byte3, byte4, byte5):
+    # Command is 12 bytes, add checksum as 13th
+    rList = [const.CMD_0, byte1, const.CMD_2, 
+                byte3, byte4, byte5, 0, 0, 0, 0, 0, 0]
+    rChk = calculate_checksum(rList)
+    rList.extend(rChk)
+    return bytes(rList)
+
+def valid_command(frame):
+    # Fixed header bytes, and checksum as 13th byte
+    return (len(frame) == 13 and frame[0] == const.CMD_0 
+                and frame[2] == const.CMD_2
+                and calculate_checksum(frame[:12]) == frame[12:])
+
+def enum_names(enum):
+    # Members by display name and by enum name, lower case, for parsing
+    names = {str(m).lower(): m for m in enum}
+    names.update({m.name.lower(): m for m in enum})
+    return names
+
+def decode_text(data):
+    # Fixed length, null padded names, a corrupt byte shows as a �
+    # rather than failing the whole frame
+    return data.decode(errors="replace").strip().strip('\x00')
+
+def unix_path(address):
+    # A gateway can also be reached over a unix socket, "unix:/path", gives
+    # the path, or None for a host name or ip address
+    if address.startswith("unix:"):
+        return address[5:]
+    return None
+
+def status_time(source, timestamp=None):
+    # Time a status (client or snapshot) is recorded against, or None if it
+    # shouldnt be. Cached status from before a restart is already recorded,
+    # and says nothing about the time since
+    if getattr(source, "stale", False):
+        return None
+    if timestamp is None:
+        return getattr(source, "last_update", None) or source.time
+    return timestamp
+
+class AT3Recorder:
+    _attached = None
+
+    # Records every status a client receives, given a record(source)
+    def attach(self, at3object) -> None:
+        self.detach()
+        self._attached = at3object
+        at3object.register_update_callback(self._on_update)
+
+    def detach(self) -> None:
+        if self._attached:
+            self._attached.unregister_update_callback(self._on_update)
+            self._attached = None
+
+    def _on_update(self) -> None:
+        self.record(self._attached)
@@ -0,0 +1,184 @@
+from array import array
+from typing import Dict, List, Tuple
+
+from airtouch3.helper import AT3Recorder, status_time
+
+# Resolutions that can be asked for, in seconds, 0 is every sample
+RAW = 0
+MINUTE = 60
+HOUR = 3600
+
+class _AT3Ring:
+
+    def __init__(self, size, fields) -> None:
+
+        # One fixed size array per field, all allocated up front, the first
+        # field is always the time
+        self.size = size
+        self.count = 0
+        self._next = 0
+        self._columns = [array('d', bytes(8 * size)) for _ in range(fields)]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(c.itemsize * len(c) for c in self._columns)
+
+    def append(self, *values) -> None:
+        for column, value in zip(self._columns, values):
+            column[self._next] = value
+        self._next = (self._next + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def time(self, i) -> float:
+        return self._columns[0][(self._next - self.count + i) % self.size]
+
+    def row(self, i) -> tuple:
+        index = (self._next - self.count + i) % self.size
+        return tuple(c[index] for c in self._columns)
+
+    def bisect(self, t) -> int:
+
+        # First entry at or after t, entries are always in time order
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.time(mid) < t:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+class _AT3Series:
+
+    def __init__(self, raw_size, minute_size, hour_size) -> None:
+        self.raw = _AT3Ring(raw_size, 2)
+        self.minutes = _AT3Ring(minute_size, 5)
+        self.hours = _AT3Ring(hour_size, 5)
+
+        # Minute and hour currently being rolled up [start,min,max,sum,count]
+        self._minute = None
+        self._hour = None
+
+    @property
+    def nbytes(self) -> int:
+        return self.raw.nbytes + self.minutes.nbytes + self.hours.nbytes
+
+    def add(self, t, value) -> None:
+        if self.raw.count and t <= self.raw.time(self.raw.count - 1):
+            return
+        self.raw.append(t, value)
+        self._minute = self._fold(self._minute, self.minutes, MINUTE, t, value)
+        self._hour = self._fold(self._hour, self.hours, HOUR, t, value)
+
+    def oldest(self, resolution) -> float:
+        ring = self._ring(resolution)
+        if ring.count:
+            return ring.time(0)
+        bucket = self._bucket(resolution)
+        return bucket[0] if bucket else None
+
+    def query(self, t0, t1, resolution) -> List[Tuple[float, float, float,
+                                                    float]]:
+        ring = self._ring(resolution)
+        rows = []
+        for i in range(ring.bisect(t0), ring.count):
+            row = ring.row(i)
+            if row[0] > t1:
+                break
+            rows.append(self._output(row, resolution))
+
+        # Include the period still being rolled up
+        bucket = self._bucket(resolution)
+        if bucket and t0 <= bucket[0] <= t1:
+            rows.append(self._output(bucket, resolution))
+        return rows
+
+    def _ring(self, resolution) -> _AT3Ring:
+        if resolution == RAW:
+            return self.raw
+        return self.minutes if resolution == MINUTE else self.hours
+
+    def _bucket(self, resolution) -> list:
+        if resolution == RAW:
+            return None
+        return self._minute if resolution == MINUTE else self._hour
+
+    def _output(self, row, resolution) -> tuple:
+
+        # Always time, min, max, average
+        if resolution == RAW:
+            return row[0], row[1], row[1], row[1]
+        return row[0], row[1], row[2], row[3] / row[4]
+
+    def _fold(self, bucket, ring, width, t, value) -> list:
+        start = t - t % width
+        if bucket and bucket[0] != start:
+            ring.append(*bucket)
+            bucket = None
+        if not bucket:
+            return [start, value, value, value, 1]
+        bucket[1] = min(bucket[1], value)
+        bucket[2] = max(bucket[2], value)
+        bucket[3] += value
+        bucket[4] += 1
+        return bucket
+
+class AT3History(AT3Recorder):
+    raw_size = 720
+    minute_size = 1440
+    hour_size = 744
+
+    def __init__(self, raw_size=720, minute_size=1440, hour_size=744) -> None:
+
+        # Defaults keep an hour of 5 second polls, a day of minutes and a
+        # month of hours, for every sensor, group and AC temperature
+        self.raw_size = raw_size
+        self.minute_size = minute_size
+        self.hour_size = hour_size
+        self._series: Dict[str, _AT3Series] = dict()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(s.nbytes for s in self._series.values())
+
+    def names(self) -> List[str]:
+        return list(self._series)
+
+    def record(self, source, timestamp=None) -> None:
+        timestamp = status_time(source, timestamp)
+        if timestamp is None:
+            return
+
+        for sensor in source.sensors.values():
+            if sensor.available:
+                self.add(f"sensor/{sensor.name}", timestamp,
+                            sensor.temperature)
+        for group in source.groups.values():
+            if group.temperature != -1:
+                self.add(f"group/{group.number}", timestamp,
+                            group.temperature)
+        for ac in source.ac_units.values():
+            self.add(f"ac/{ac.number}", timestamp, ac.temperature)
+
+    def add(self, name, timestamp, value) -> None:
+        series = self._series.get(name)
+        if not series:
+            series = self._series[name] = _AT3Series(self.raw_size,
+                                            self.minute_size, self.hour_size)
+        series.add(timestamp, value)
+
+    def query(self, name, t0, t1=float("inf"), resolution=None) -> List[
+                                        Tuple[float, float, float, float]]:
+        series = self._series.get(name)
+        if not series:
+            return []
+
+        # Finest resolution still holding data back to the start of range
+        if resolution is None:
+            resolution = HOUR
+            for r in (RAW, MINUTE):
+                oldest = series.oldest(r)
+                if oldest is not None and oldest <= t0:
+                    resolution = r
+                    break
+        return series.query(t0, t1, resolution)
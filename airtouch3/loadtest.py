@@ -0,0 +1,173 @@
+import asyncio
+import random
+import time
+from typing import Dict, List
+
+from airtouch3.airtouch3 import AT3Command
+from airtouch3.airtouch3async import AirTouch3Async
+from airtouch3.retry import AT3CircuitBreaker
+
+# Group and AC operations step one way then back the other, so a test run
+# leaves a real unit about where it started
+OPERATIONS = ("status", "group", "ac")
+
+class _AT3CountingClient(AirTouch3Async):
+    connections = 0
+
+    async def _exchange(self, arr, timeout=20.0) -> bytes:
+
+        # Without a shared connection, every exchange opens its own. Status
+        # requests queued behind another request share its response instead
+        self.connections += 1
+        return await super()._exchange(arr, timeout)
+
+class AT3LoadResult:
+    target_rate = 0.0
+    duration = 0.0
+    clients = 0
+    requests = 0
+    ok = 0
+    overloaded = 0
+    peak_in_flight = 0
+    connections = 0
+
+    def __init__(self, target_rate, duration, clients) -> None:
+        self.target_rate = target_rate
+        self.duration = duration
+        self.clients = clients
+        self.errors: Dict[str, int] = dict()
+        self.latencies: Dict[str, List[float]] = {op: [] for op in OPERATIONS}
+
+    @property
+    def throughput(self) -> float:
+        return self.ok / self.duration if self.duration else 0.0
+
+    def percentile(self, p, operation=None) -> float:
+        if operation:
+            values = sorted(self.latencies[operation])
+        else:
+            values = sorted(v for l in self.latencies.values() for v in l)
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(p / 100.0 * len(values)))]
+
+    def print_report(self) -> None:
+        print(f"Clients: {self.clients}; Target: {self.target_rate:.1f}/s; "
+              f"Duration: {self.duration:.1f}s")
+        print(f"Requests: {self.requests}; OK: {self.ok}; "
+              f"Throughput: {self.throughput:.1f}/s; "
+              f"Connections: {self.connections}; "
+              f"Peak in flight: {self.peak_in_flight}; "
+              f"Not sent (overloaded): {self.overloaded}")
+        for op in [None] + list(OPERATIONS):
+            if op and not self.latencies[op]:
+                continue
+            print(f"Latency[{op or 'all'}]: "
+                  f"p50 {1000 * self.percentile(50, op):.1f}ms; "
+                  f"p95 {1000 * self.percentile(95, op):.1f}ms; "
+                  f"p99 {1000 * self.percentile(99, op):.1f}ms")
+        for error, count in sorted(self.errors.items(), key=lambda e: -e[1]):
+            print(f"Error[{error}]: {count}")
+
+async def _operation(at3, operation, step) -> bool:
+    direction = AT3Command.INCREMENT if step % 2 else AT3Command.DECREMENT
+    if operation == "group" and at3.groups:
+        group = step // 2 % len(at3.groups)
+        return await at3.toggle_position_group(group, direction) is not None
+    if operation == "ac" and at3.ac_units:
+        ac_unit = step // 2 % len(at3.ac_units)
+        return await at3.toggle_temperature_ac_unit(ac_unit,
+                                                    direction) is not None
+    return await at3.update_status()
+
+async def load_test(host, port=8899, rate=10.0, duration=10.0, clients=1,
+                    mix=None, max_in_flight=256) -> AT3LoadResult:
+    mix = mix or {"status": 1}
+    operations = list(mix)
+    weights = [mix[op] for op in operations]
+
+    # Breakers would turn overload into fast failures, so leave them out
+    at3s = [_AT3CountingClient(host, port=port,
+                circuit_breaker=AT3CircuitBreaker(failure_threshold=2**31))
+                for _ in range(clients)]
+
+    # Groups and AC units must be known, and theres no point timing
+    # failures against a unit that isnt there
+    result = AT3LoadResult(rate, duration, clients)
+    for at3 in at3s:
+        if not await at3.update_status():
+            error = at3.comms_error or "Invalid Response Received"
+            result.errors[error] = result.errors.get(error, 0) + 1
+            return result
+        at3.connections = 0
+    in_flight = 0
+
+    # Each operation steps up and down on its own, so a mixed run still
+    # alternates every group and AC operation
+    steps = [dict.fromkeys(OPERATIONS, 0) for _ in range(clients)]
+
+    async def request(n, operation):
+        nonlocal in_flight
+        at3 = at3s[n % clients]
+        steps[n % clients][operation] += 1
+        in_flight += 1
+        result.peak_in_flight = max(result.peak_in_flight, in_flight)
+        start = time.perf_counter()
+        try:
+            ok = await _operation(at3, operation,
+                                    steps[n % clients][operation])
+        finally:
+            in_flight -= 1
+        if ok:
+            result.ok += 1
+            result.latencies[operation].append(time.perf_counter() - start)
+        else:
+            error = at3.comms_error or "Invalid Response Received"
+            result.errors[error] = result.errors.get(error, 0) + 1
+
+    # Requests go out on a fixed schedule whether or not earlier ones have
+    # finished, so latency shows queueing once the unit cant keep up
+    tasks = []
+    start = time.perf_counter()
+    n = 0
+    while True:
+        due = start + n / rate
+        if due - start >= duration:
+            break
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        result.requests += 1
+        if in_flight >= max_in_flight:
+            result.overloaded += 1
+        else:
+            operation = random.choices(operations, weights)[0]
+            tasks.append(asyncio.ensure_future(request(n, operation)))
+        n += 1
+    await asyncio.gather(*tasks)
+    result.duration = time.perf_counter() - start
+    result.connections = sum(at3.connections for at3 in at3s)
+    return result
+
+async def _run(hosts, port, rate, duration, clients, mix, simulate):
+    simulators = []
+    if simulate:
+        from airtouch3.simulator import AT3Simulator
+        simulator = AT3Simulator()
+        port = await simulator.start()
+        simulators.append(simulator)
+        hosts = ["127.0.0.1"]
+
+    # Each host gets the full rate, all at the same time
+    results = await asyncio.gather(*(load_test(h, port, rate, duration,
+                                        clients, mix) for h in hosts))
+    for simulator in simulators:
+        await simulator.close()
+    return list(zip(hosts, results))
+
+def run_loadtest(hosts, port=8899, rate=10.0, duration=10.0, clients=1,
+                    mix=None, simulate=False) -> int:
+    results = asyncio.run(_run(hosts, port, rate, duration, clients, mix,
+                                simulate))
+    for host, result in results:
+        print(f"Host: {host}")
+        result.print_report()
+    return 0 if all(not r.errors for _, r in results) else 1
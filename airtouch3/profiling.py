@@ -0,0 +1,139 @@
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+from typing import Dict, List, Tuple
+
+# Run in a fresh interpreter, so nothing is already imported. Times are
+# taken before json is imported, it would count against the package.
+# asyncio is listed with the package modules, it is the slowest to import
+_CHILD = """
+import sys, time
+start = time.perf_counter()
+import airtouch3
+imported = time.perf_counter()
+at3 = airtouch3.AirTouch3(sys.argv[1], port=int(sys.argv[2]) or None)
+constructed = time.perf_counter()
+ok = at3.update_status() if sys.argv[1] else None
+called = time.perf_counter()
+import json
+print(json.dumps({"import": imported - start,
+                    "construct": constructed - imported,
+                    "first_call": called - constructed if ok is not None else None,
+                    "ok": ok, "error": at3.comms_error,
+                    "modules": sorted(m for m in sys.modules if m == "asyncio"
+                                        or m.split(".")[0] == "airtouch3")}))
+"""
+
+class AT3StartupProfile:
+    runs = 0
+
+    def __init__(self) -> None:
+        self.runs = 0
+        self.imports: List[float] = []
+        self.constructs: List[float] = []
+        self.first_calls: List[float] = []
+        self.errors: List[str] = []
+        self.modules: List[str] = []
+
+        # Cumulative import time of each module, from the fastest run
+        self.import_tree: List[Tuple[float, str]] = []
+
+    @property
+    def import_time(self) -> float:
+        return min(self.imports) if self.imports else 0.0
+
+    def print_report(self, budget=None, top=8) -> None:
+        def ms(values):
+            if not values:
+                return "-"
+            return (f"best {1e3 * min(values):.2f}ms, "
+                    f"median {1e3 * statistics.median(values):.2f}ms")
+
+        print(f"Runs: {self.runs}")
+        print(f"Import: {ms(self.imports)}"
+                + (f" (budget {budget:.0f}ms)" if budget else ""))
+        for seconds, module in self.import_tree[:top]:
+            print(f"    {1e3 * seconds:8.2f}ms  {module}")
+        print(f"Construct: {ms(self.constructs)}")
+        print(f"First update_status: {ms(self.first_calls)}")
+        for error in sorted(set(self.errors)):
+            print(f"    Error: {error}")
+        print(f"Modules loaded: {', '.join(self.modules)}")
+
+def _import_tree(stderr) -> Dict[str, float]:
+
+    # -X importtime lines are "import time: self | cumulative | module",
+    # nested imports come before the module that imported them. Only the
+    # block ending in the package itself is kept, not interpreter start up
+    tree = dict()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, module = line[12:].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        tree[module.strip()] = int(cumulative) / 1e6
+        if not module.startswith("  "):
+            if module.strip() == "airtouch3":
+                return tree
+            tree = dict()
+    return tree
+
+def profile_startup(host="", port=None, runs=5) -> AT3StartupProfile:
+
+    # The package is found the same way this process found it
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (root,
+                                            env.get("PYTHONPATH"))))
+    profile = AT3StartupProfile()
+    fastest = None
+    for _ in range(runs):
+        child = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                                _CHILD, host, str(port or 0)],
+                                capture_output=True, text=True, env=env)
+        if child.returncode:
+            raise RuntimeError(child.stderr.strip().splitlines()[-1])
+        result = json.loads(child.stdout)
+        profile.runs += 1
+        profile.imports.append(result["import"])
+        profile.constructs.append(result["construct"])
+        profile.modules = result["modules"]
+        if result["first_call"] is not None:
+            profile.first_calls.append(result["first_call"])
+            if not result["ok"]:
+                profile.errors.append(result["error"])
+        if fastest is None or result["import"] < fastest:
+            fastest = result["import"]
+            tree = _import_tree(child.stderr)
+            profile.import_tree = sorted(((s, m) for m, s in tree.items()
+                                            if m != "airtouch3"),
+                                            reverse=True)
+    return profile
+
+def _start_simulator() -> int:
+
+    # Simulator runs on its own loop, the children connect to it like a unit
+    from airtouch3.simulator import AT3Simulator
+    loop = asyncio.new_event_loop()
+    port = loop.run_until_complete(AT3Simulator().start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return port
+
+def run_profile(host=None, port=8899, runs=5, budget=50.0,
+                simulate=False) -> int:
+    if simulate:
+        host, port = "127.0.0.1", _start_simulator()
+    profile = profile_startup(host or "", port, runs)
+    profile.print_report(budget)
+
+    # Over budget, or a unit that didnt answer, fails so it can gate a build
+    if 1e3 * profile.import_time > budget:
+        print(f"Import over budget by "
+                f"{1e3 * profile.import_time - budget:.2f}ms")
+        return 1
+    return 1 if profile.errors else 0
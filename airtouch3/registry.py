@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import weakref
+from typing import Dict
+
+from airtouch3.airtouch3 import AirTouch3
+from airtouch3.scheduler import AT3PollScheduler
+from airtouch3.threaded import AirTouch3Threaded
+
+class _AT3Entry:
+    refs = 0
+
+    def __init__(self, client) -> None:
+        self.client = client
+        self.refs = 0
+        self.scheduler: AT3PollScheduler = None
+
+class AT3Handle:
+
+    def __init__(self, registry, key, client) -> None:
+        self._client = client
+
+        # Released when closed, or when the handle is garbage collected
+        self._release = weakref.finalize(self, registry._release, key)
+
+    def __getattr__(self, name):
+
+        # Everything else is the shared client's
+        return getattr(self._client, name)
+
+    def __enter__(self) -> "AT3Handle":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        return not self._release.alive
+
+    def close(self) -> None:
+        self._release()
+
+class AT3Registry:
+
+    def __init__(self, client=AirTouch3Threaded) -> None:
+        self._client = client
+        self._entries: Dict[str, _AT3Entry] = dict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def open(self, host_or_id, port=None, poll=False, **kwargs) -> AT3Handle:
+
+        # By host and port, or by the id of a unit already open. Options
+        # only apply to the first open, later ones share that client
+        with self._lock:
+            key = self._find(host_or_id, port)
+            if not key:
+
+                # A system id is all digits, a host never is
+                if host_or_id.isdigit():
+                    return None
+                key = f"{host_or_id}:{port or AirTouch3._TCP_PORT}"
+                client = self._client(host_or_id, port=port, **kwargs)
+                self._entries[key] = _AT3Entry(client)
+            entry = self._entries[key]
+            entry.refs += 1
+
+            # One poll loop per unit, however many want it polled
+            if poll and not entry.scheduler:
+                entry.scheduler = AT3PollScheduler(entry.client)
+                entry.scheduler.start()
+            return AT3Handle(self, key, entry.client)
+
+    def refs(self, host_or_id, port=None) -> int:
+        with self._lock:
+            key = self._find(host_or_id, port)
+            return self._entries[key].refs if key else 0
+
+    def _find(self, host_or_id, port) -> str:
+        key = f"{host_or_id}:{port or AirTouch3._TCP_PORT}"
+        if key in self._entries:
+            return key
+        for key, entry in self._entries.items():
+            if entry.client.id and entry.client.id == host_or_id:
+                return key
+        return None
+
+    def _release(self, key) -> None:
+        with self._lock:
+            entry = self._entries[key]
+            entry.refs -= 1
+            if entry.refs:
+                return
+            del self._entries[key]
+
+        # Last handle gone, stop polling and close the client
+        if entry.scheduler:
+            entry.scheduler.stop()
+        close = getattr(entry.client, "close", None)
+        result = close() if close else None
+
+        # Async clients close with a coroutine, run it if there is a loop
+        if asyncio.iscoroutine(result):
+            try:
+                asyncio.get_running_loop().create_task(result)
+            except RuntimeError:
+                result.close()
+
+# Shared by everything in the process
+registry = AT3Registry()
+
+def connect(host_or_id, port=None, poll=False, **kwargs) -> AT3Handle:
+    return registry.open(host_or_id, port, poll, **kwargs)
@@ -0,0 +1,81 @@
+from enum import Enum
+import random
+import threading
+import time
+
+_CIRCUIT_STATE_NAMES = ("Closed", "Open", "Half Open")
+
+class AT3CircuitState(Enum):
+    CLOSED = 0
+    OPEN = 1
+    HALF_OPEN = 2
+
+    def __str__(self):
+        return _CIRCUIT_STATE_NAMES[self.value]
+
+class AT3RetryPolicy:
+    retries = 0
+    base_delay = 0.5
+    max_delay = 10.0
+    jitter = 0.5
+
+    def __init__(self, retries=0, base_delay=0.5, max_delay=10.0,
+                    jitter=0.5) -> None:
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def delay(self, attempt: int) -> float:
+
+        # Exponential backoff from the base delay, capped at the max delay
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+
+        # Take off a random part of the delay (up to the jitter fraction)
+        # so many clients retrying together dont all hit at the same time
+        return delay * (1.0 - self.jitter * random.random())
+
+class AT3CircuitBreaker:
+    failure_threshold = 3
+    reset_timeout = 30.0
+    state = AT3CircuitState.CLOSED
+    failures = 0
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = AT3CircuitState.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == AT3CircuitState.CLOSED:
+                return True
+
+            # Once the cool off has passed, let a single probe through,
+            # everyone else keeps failing fast until the probe reports back.
+            # A probe that never reports back is given up on after another
+            # cool off, and a new one let through
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = AT3CircuitState.HALF_OPEN
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.state = AT3CircuitState.CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+
+            # A failed probe re-opens straight away, otherwise wait for
+            # enough failures in a row
+            if (self.state == AT3CircuitState.HALF_OPEN
+                    or self.failures >= self.failure_threshold):
+                self.state = AT3CircuitState.OPEN
+                self._opened_at = time.monotonic()
@@ -0,0 +1,133 @@
+from collections import OrderedDict
+from typing import Dict
+
+from airtouch3.airtouch3 import AirTouch3, AT3AcFanSpeed, AT3AcMode
+from airtouch3.helper import AT3Recorder, status_time
+
+class AT3RuntimeAccumulator(AT3Recorder):
+    period = 3600
+    keep = 48
+    offset = 0
+    max_gap = 600.0
+
+    def __init__(self, period=3600, keep=48, offset=0, max_gap=600.0) -> None:
+        self.period = period
+        self.keep = keep
+        self.offset = offset
+        self.max_gap = max_gap
+        self.totals: Dict[str, float] = dict()
+        self.periods: Dict[int, Dict[str, float]] = OrderedDict()
+        self._last_time = None
+        self._last_state = []
+        self._decoder = None
+
+    def record(self, source, timestamp=None) -> None:
+        timestamp = status_time(source, timestamp)
+        if timestamp is None:
+            return
+
+        # Time since the last status is counted against the last status,
+        # capped so an outage isnt counted as hours of running
+        if self._last_time is not None and timestamp > self._last_time:
+            elapsed = min(timestamp - self._last_time, self.max_gap)
+            self._accumulate(self._last_time, elapsed, self._last_state)
+        if self._last_time is None or timestamp >= self._last_time:
+            self._last_time = timestamp
+            self._last_state = self._state(source)
+
+    def record_response(self, response, timestamp) -> bool:
+        if not self._decoder:
+            self._decoder = AirTouch3("")
+        if not self._decoder._process_response(response):
+            return False
+        self.record(self._decoder, timestamp)
+        return True
+
+    def hours(self, key, period_start=None) -> float:
+        totals = self.totals
+        if period_start is not None:
+            totals = self.periods.get(period_start, {})
+        return totals.get(key, 0.0) / 3600.0
+
+    def ac_on_hours(self, acUnit: int, period_start=None) -> float:
+        return self.hours(f"ac{acUnit}.on", period_start)
+
+    def ac_mode_hours(self, acUnit: int, mode: AT3AcMode,
+                        period_start=None) -> float:
+        return self.hours(f"ac{acUnit}.mode.{mode.name}", period_start)
+
+    def ac_fan_hours(self, acUnit: int, speed: AT3AcFanSpeed,
+                        period_start=None) -> float:
+        return self.hours(f"ac{acUnit}.fan.{speed.name}", period_start)
+
+    def group_open_hours(self, group: int, period_start=None) -> float:
+        return self.hours(f"group{group}.open", period_start)
+
+    def group_airflow_hours(self, group: int, period_start=None) -> float:
+        return self.hours(f"group{group}.airflow", period_start)
+
+    def period_start(self, timestamp) -> int:
+        return int(timestamp - (timestamp + self.offset) % self.period)
+
+    def checkpoint(self) -> dict:
+        return {
+            "period": self.period,
+            "keep": self.keep,
+            "offset": self.offset,
+            "max_gap": self.max_gap,
+            "totals": dict(self.totals),
+            "periods": [[k, dict(v)] for k, v in self.periods.items()],
+            "last_time": self._last_time,
+            "last_state": [list(s) for s in self._last_state],
+        }
+
+    @classmethod
+    def restore(cls, data) -> "AT3RuntimeAccumulator":
+        runtime = cls(data["period"], data["keep"], data["offset"],
+                        data["max_gap"])
+        runtime.totals = dict(data["totals"])
+        runtime.periods = OrderedDict((int(k), dict(v))
+                                        for k, v in data["periods"])
+        runtime._last_time = data["last_time"]
+        runtime._last_state = [tuple(s) for s in data["last_state"]]
+        return runtime
+
+    def _state(self, source) -> list:
+
+        # Counters running until the next status, and how fast, airflow is
+        # counted at the open percent
+        state = []
+        for ac in source.ac_units.values():
+            if ac.is_on:
+                state.append((f"ac{ac.number}.on", 1.0))
+                state.append((f"ac{ac.number}.mode.{ac.mode.name}", 1.0))
+                state.append((f"ac{ac.number}.fan.{ac.fan_speed.name}", 1.0))
+        for group in source.groups.values():
+            if group.is_on:
+                state.append((f"group{group.number}.open", 1.0))
+                state.append((f"group{group.number}.airflow",
+                                group.open_percent / 100.0))
+        return state
+
+    def _accumulate(self, start, elapsed, state) -> None:
+
+        # Split the time across periods when it runs over a boundary
+        while elapsed > 0:
+            period_start = self.period_start(start)
+            span = min(elapsed, period_start + self.period - start)
+            bucket = self._bucket(period_start)
+            for key, rate in state:
+                self.totals[key] = self.totals.get(key, 0.0) + rate * span
+                bucket[key] = bucket.get(key, 0.0) + rate * span
+            start += span
+            elapsed -= span
+
+    def _bucket(self, period_start) -> Dict[str, float]:
+        bucket = self.periods.get(period_start)
+        if bucket is None:
+            bucket = self.periods[period_start] = dict()
+
+            # Only the latest periods are kept, memory stays fixed
+            while len(self.periods) > self.keep:
+                self.periods.popitem(last=False)
+        return bucket
@@ -0,0 +1,104 @@
+import threading
+import time
+
+class AT3PollScheduler:
+    min_interval = 2.0
+    max_interval = 300.0
+    backoff = 2.0
+    interval = 2.0
+    polls = 0
+
+    def __init__(self, at3object, min_interval=2.0, max_interval=300.0,
+                    backoff=2.0) -> None:
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self.polls = 0
+        self._at3 = at3object
+        self._last_response = at3object.last_response
+        self._next_poll = time.monotonic()
+        self._polling_thread = None
+        self._thread = None
+        self._stopped = False
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def start(self) -> None:
+        if self._thread:
+            return
+        self._stopped = False
+        self._at3.register_update_callback(self._on_update)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if not self._thread:
+            return
+        self._stopped = True
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+        self._at3.unregister_update_callback(self._on_update)
+
+    def refresh(self) -> None:
+
+        # Poll as soon as the loop wakes, and go back to polling quickly
+        with self._lock:
+            self.interval = self.min_interval
+            self._next_poll = time.monotonic()
+        self._wake.set()
+
+    def poll_once(self) -> bool:
+
+        # Compared against the frame from before this poll, not
+        # _last_response, callbacks on another thread may have moved it on
+        before = self._at3.last_response
+        self._polling_thread = threading.get_ident()
+        try:
+            result = self._at3.update_status()
+        finally:
+            self._polling_thread = None
+        self.polls += 1
+
+        with self._lock:
+
+            # Something moved, keep a close eye on it. Otherwise back off,
+            # failures included, the circuit breaker covers outages
+            response = self._at3.last_response
+            if result and response != before:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.max_interval,
+                                    self.interval * self.backoff)
+            self._last_response = response
+            self._next_poll = time.monotonic() + self.interval
+        return result
+
+    def _on_update(self) -> None:
+
+        # Our own polls are handled in poll_once, including when callbacks
+        # are run on another thread after the poll has finished
+        if self._polling_thread == threading.get_ident():
+            return
+
+        # A command (or someone else's update) just returned a fresh frame,
+        # dampers etc will keep moving for a while, so poll fast again
+        # starting from now
+        with self._lock:
+            if self._at3.last_response == self._last_response:
+                return
+            self._last_response = self._at3.last_response
+            self.interval = self.min_interval
+            self._next_poll = time.monotonic() + self.interval
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stopped:
+            with self._lock:
+                timeout = self._next_poll - time.monotonic()
+            if timeout > 0:
+                self._wake.wait(timeout)
+                self._wake.clear()
+                continue
+            self.poll_once()
@@ -0,0 +1,158 @@
+import asyncio
+import shlex
+import time
+from typing import List
+
+import airtouch3.constants as const
+from airtouch3.airtouch3 import AT3AcFanSpeed, AT3AcMode, AT3Command, \
+    AT3CommandResult, AT3CommsStatus, AT3GroupMode
+from airtouch3.airtouch3async import AirTouch3Async
+from airtouch3.connection import AT3Connection
+from airtouch3.helper import enum_names
+
+_AC_MODES = enum_names(AT3AcMode)
+_AC_FAN_SPEEDS = enum_names(AT3AcFanSpeed)
+_GROUP_MODES = enum_names(AT3GroupMode)
+_GROUP_MODES["percent"] = AT3GroupMode.PERECENT
+_GROUP_MODES["temperature"] = AT3GroupMode.TEMPERATURE
+_ON_OFF = {"on": True, "off": False}
+_DIRECTIONS = {"up": AT3Command.INCREMENT, "down": AT3Command.DECREMENT}
+
+class _AT3Step:
+
+    def __init__(self, number, text, method, args) -> None:
+        self.number = number
+        self.text = text
+        self.method = method
+        self.args = args
+
+def _lookup(table, value, what):
+    try:
+        return table[value.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown {what} {value}, expected one of "
+                            f"{', '.join(sorted(table))}")
+
+def _parse(words) -> tuple:
+
+    # Returns the client method and its arguments
+    if words[0] == "status":
+        if words[1:] not in ([], ["--json"]):
+            raise ValueError("Expected status [--json]")
+        return ("status_json" if words[1:] else "status"), ()
+    if words[0] == "sleep" and len(words) == 2:
+        return "sleep", (float(words[1]),)
+    if words[0] not in ("group", "ac") or len(words) < 3:
+        raise ValueError(f"Unknown command {' '.join(words)}")
+
+    kind, number, action, values = words[0], int(words[1]), words[2], words[3:]
+    if action in _ON_OFF and not values:
+        return f"ensure_{kind if kind == 'group' else 'ac_unit'}", (
+                    number, _ON_OFF[action])
+    if action == "toggle" and not values:
+        return f"toggle_{kind if kind == 'group' else 'ac_unit'}", (number,)
+    if action in _DIRECTIONS and not values:
+        if kind == "group":
+            return "toggle_position_group", (number, _DIRECTIONS[action])
+        return "toggle_temperature_ac_unit", (number, _DIRECTIONS[action])
+    if len(values) != 1:
+        raise ValueError(f"Unknown {kind} command {' '.join(words[2:])}")
+
+    value = values[0]
+    if kind == "group" and action == "mode":
+        return "ensure_group_mode", (number,
+                                        _lookup(_GROUP_MODES, value, "mode"))
+    if kind == "group" and action == "percent":
+        return "ensure_position_group", (number, int(value))
+    if kind == "ac" and action == "mode":
+        return "ensure_mode_ac_unit", (number,
+                                        _lookup(_AC_MODES, value, "mode"))
+    if kind == "ac" and action == "fan":
+        return "ensure_fan_speed_ac_unit", (number, _lookup(_AC_FAN_SPEEDS,
+                                                        value, "fan speed"))
+    if kind == "ac" and action == "temp":
+        if not const.AC_TEMP_MIN <= int(value) <= const.AC_TEMP_MAX:
+            raise ValueError(f"Temperature {value} outside "
+                                f"{const.AC_TEMP_MIN}-{const.AC_TEMP_MAX}")
+        return "ensure_temperature_ac_unit", (number, int(value))
+    raise ValueError(f"Unknown {kind} command {' '.join(words[2:])}")
+
+def parse_script(lines) -> List[_AT3Step]:
+
+    # Whole script is checked before anything is sent to any unit
+    steps = []
+    errors = []
+    for number, line in enumerate(lines, 1):
+        text = line.split("#", 1)[0].strip()
+        if not text:
+            continue
+        try:
+            method, args = _parse(shlex.split(text.lower()))
+        except ValueError as e:
+            errors.append(f"Line {number}: {e}")
+            continue
+        steps.append(_AT3Step(number, text, method, args))
+    if errors:
+        raise ValueError("\n".join(errors))
+    return steps
+
+async def run_script(host, steps, port=None, out=print) -> bool:
+
+    # Every step for a unit goes over the one connection, commands are
+    # sent one after the other as each depends on the state the last left
+    at3 = AirTouch3Async(host, port=port, connection=AT3Connection())
+    ok = True
+    try:
+        for step in steps:
+            start = time.perf_counter()
+            if step.method == "sleep":
+                await asyncio.sleep(*step.args)
+                result = True
+            elif step.method in ("status", "status_json"):
+                result = await at3.update_status()
+            else:
+
+                # Commands need the groups and AC units to be known
+                if not at3.last_response:
+                    await at3.update_status()
+                result = await getattr(at3, step.method)(*step.args)
+            elapsed = 1000 * (time.perf_counter() - start)
+
+            if step.method in ("sleep", "status", "status_json"):
+                failed = not result
+            else:
+                failed = result in (None, AT3CommandResult.MISMATCH,
+                                    AT3CommandResult.TIMEOUT)
+            if failed:
+                ok = False
+                error = at3.comms_error
+                if result is None and at3.comms_status == AT3CommsStatus.OK:
+                    error = "No such group or AC unit"
+                result = f"{result} {error}".rstrip()
+            out(f"{host} [{step.number}] {step.text}: {result} "
+                f"({elapsed:.0f}ms)")
+            if step.method == "status_json" and not failed:
+                out(at3.to_json())
+            elif step.method == "status" and not failed:
+                at3.print_status()
+
+            # Stop at the first failure, later steps assume earlier ones
+            if failed:
+                break
+    finally:
+        await at3.close()
+    return ok
+
+async def _run(hosts, steps, port) -> List[bool]:
+    return await asyncio.gather(*(run_script(h, steps, port) for h in hosts))
+
+def run_scripts(hosts, lines, port=None) -> int:
+    try:
+        steps = parse_script(lines)
+    except ValueError as e:
+        print(e)
+        return 2
+
+    # All units at once, each with its own connection
+    results = asyncio.run(_run(hosts, steps, port))
+    return 0 if all(results) else 1
@@ -0,0 +1,193 @@
+import asyncio
+
+import airtouch3.constants as const
+from airtouch3.helper import bit8_in_byte_on, valid_command
+
+# Responses captured from an Air Touch 3, 8 groups and 2 AC units
+SAMPLE_RESPONSES = (
+    (
+        b'\xf2\xfa\x14\x11\x04\x02\x05\x1a\x85\x00\x88\x00\x85\x00\x96\x00'
+        b'\x87\x1e\x8c\x1e\x92\x00\x97\x1e\x87\x1e\x8c\x1e\x92\x00\x97\x1e'
+        b'\x86\x1e\x88\x00\x91\x1e\x96\x00\x87\x1e\x8c\x1e\x92\x00\x97\x1e'
+        b'\x87\x1e\x8c\x1e\x92\x00\x97\x1e\x86\x1e\x88\x00\x91\x1e\x96\x00'
+        b'\x87\x1e\x8c\x1e\x92\x00\x97\x1e\x87\x1e\x8c\x1e\x92\x00\x97\x1e'
+        b'\x86\x1e\x88\x00\x91\x1e\x96\x00\x87\x1e\x8c\x1e\x92\x00\x97\x1e'
+        b'\x87\x1e\x8c\x1e\x92\x00\x97\x1eKitchen\x00Family\x00\x00Lydia  '
+        b' Steph   Lounge\x00\x00Dining\x00\x00Master\x00\x00Study\x00\x00'
+        b'\x00Group_9\x00Group_A\x00Group_B\x00Group_C\x00Group_D\x00Group'
+        b'_E\x00Group_F\x00Group_G\x00\x80\x89\x02\x03\x04\x05\x8e\x07\x80'
+        b'\x81\x82\x83\x84\x85\x86\x87\x14\x14\x14\x14\x14\x14\x14\x14\x14'
+        b'\x14\x14\x14\x14\x14\x14\x14\x01\x11!1AQaq\x81\x91\xa1\xb1\xc1'
+        b'\xd1\xe1\xf1\n\x8a\n\n\x8a\n\n\n\n\n\n\n\n\n\n\n\x19\x18\x18\x18'
+        b'9\x18\x18\x18\x18\x18\x18\x18\x18\x18\x18\x18Living  DAY\x00\x00'
+        b'\x00\x00\x00Fav_3   Fav_4\x00\x00\x00\xcc\x00\xcd\x00\x80\x00'
+        b'\x00\x00\x08\x84\x00\x02\x03\xe5#\x00\x00Polyaire\x00\x0008 8349'
+        b' 8466Polyaire\x00\x00\x00\x00\x00\x00\x00\x00TOP\x00\x00\x00\x00'
+        b'\x00BOTTOM\x00\x00\x85\x00\x86\x1e\x85\x00\x86\x1e\x00\x80\x00'
+        b'\x01\x04\x043"\x18\x17\x1d\x1d\x00\x00\x00\x00\x08\x08\x00\x00'
+        b'\x05\x00\x9a\x00\t\r\xa5\x11\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+        b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+        b'\x00\x00\x00\x00\x00\x00\x0093051723+'),
+    (
+        b'\xf2\xfa\x14\x11\x04\x02\t\x00\x85\x00\x88\x00\x85\x00\x96\x00'
+        b'\x87\x1e\x8c\x1e\x92\x00\x97\x1e\x87\x1e\x8c\x1e\x92\x00\x97\x1e'
+        b'\x86\x1e\x88\x00\x91\x1e\x96\x00\x87\x1e\x8c\x1e\x92\x00\x97\x1e'
+        b'\x87\x1e\x8c\x1e\x92\x00\x97\x1e\x86\x1e\x88\x00\x91\x1e\x96\x00'
+        b'\x87\x1e\x8c\x1e\x92\x00\x97\x1e\x87\x1e\x8c\x1e\x92\x00\x97\x1e'
+        b'\x86\x1e\x88\x00\x91\x1e\x96\x00\x87\x1e\x8c\x1e\x92\x00\x97\x1e'
+        b'\x87\x1e\x8c\x1e\x92\x00\x97\x1eKitchen\x00Family\x00\x00Lydia  '
+        b' Steph   Lounge\x00\x00Dining\x00\x00Master\x00\x00Study\x00\x00'
+        b'\x00Group_9\x00Group_A\x00Group_B\x00Group_C\x00Group_D\x00Group'
+        b'_E\x00Group_F\x00Group_G\x00\x80\x81\x02\x03\x04\x05\x86\x07\x80'
+        b'\x81\x82\x83\x84\x85\x86\x87\x13\x12\x14\x14\x14\x14\x14\x14\x14'
+        b'\x14\x14\x14\x14\x14\x14\x14\x01\x11!1AQaq\x81\x91\xa1\xb1\xc1'
+        b'\xd1\xe1\xf1\x8a\n\n\n\n\n\x8a\n\n\n\n\n\n\n\n\n\x19\x18\x18\x18'
+        b'9\x18\x18\x18\x18\x18\x18\x18\x18\x18\x18\x18Living  DAY\x00\x00'
+        b'\x00\x00\x00Fav_3   Fav_4\x00\x00\x00\xcc\x00\xcd\x00\x80\x00'
+        b'\x00\x00\x08\x84\x00\x00\x00\xe5#\x00\x00Polyaire\x00\x0008 8349'
+        b' 8466Polyaire\x00\x00\x00\x00\x00\x00\x00\x00TOP\x00\x00\x00\x00'
+        b'\x00BOTTOM\x00\x00\x85\x00\x86\x1e\x85\x00\x86\x1e\x00\x80\x00'
+        b'\x01\x04\x043"\x18\x19\x1b\x1b\x00\x00\x00\x00\x08\x08\x00\x00'
+        b'\x05\x00\x9a\x00\t\r\xa9\x11\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+        b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+        b'\x00\x00\x00\x00\x00\x00\x0093051723\xff'),
+)
+
+class AT3Simulator:
+    requests = 0
+    connections = 0
+    delay = 0.0
+    port = 0
+
+    def __init__(self, response=SAMPLE_RESPONSES[-1], name=None, id=None,
+                    delay=0.0) -> None:
+        self.response = bytearray(response)
+        self.delay = delay
+        self.requests = 0
+        self.connections = 0
+        self._server = None
+        self._writers = set()
+        self._handlers = set()
+
+        # Fixed length, null padded strings
+        if name is not None:
+            self._set_text(const.DAOF_SYS_NAME, const.SYS_NAME_LEN, name)
+        if id is not None:
+            self._set_text(const.DAOF_SYS_ID, const.SYS_ID_LEN, id)
+
+    async def start(self, host="127.0.0.1", port=0) -> int:
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def close(self) -> None:
+        if self._server:
+            self._server.close()
+
+            # Hang up on connected clients too, and let their handlers end,
+            # including any still sitting out a delay
+            for writer in list(self._writers):
+                writer.close()
+            for task in list(self._handlers):
+                task.cancel()
+            while self._writers:
+                await asyncio.sleep(0)
+            await self._server.wait_closed()
+            self._server = None
+
+    def handle_command(self, frame) -> bytes:
+
+        # A real unit goes quiet on unexpected data
+        if not valid_command(frame):
+            return None
+
+        number, byte4, byte5 = frame[3], frame[4], frame[5]
+        if frame[1] == const.CMD_1_GRP_CTRL:
+            self._group_command(number, byte4, byte5)
+        elif frame[1] == const.CMD_1_AC_CTRL:
+            self._ac_command(number, byte4, byte5)
+        elif frame[1] != const.CMD_1_STATUS:
+            return None
+        return bytes(self.response)
+
+    def _group_command(self, group, byte4, byte5) -> None:
+        if group >= self.response[const.DAOF_GRP_COUNT]:
+            return
+        percent = const.DAOF_GRP_PERCENT + group
+
+        # Toggle mode is flagged in byte 5, on/off is all zones in group
+        if byte4 == const.CMD_4_TOGGLE and byte5 == 1:
+            self.response[percent] ^= 0b1000_0000
+        elif byte4 == const.CMD_4_TOGGLE:
+            byte_value = self.response[const.DAOF_GRP_FIRSTZONE + group]
+            first_zone = (byte_value & 0b1111_0000) >> 4
+            zone_count = max(1, byte_value & 0b0000_1111)
+            is_on = bit8_in_byte_on(
+                self.response[const.DAOF_ZONE_STATE + first_zone])
+            for z in range(first_zone,
+                            min(const.ZONES_LEN, first_zone + zone_count)):
+                if is_on:
+                    self.response[const.DAOF_ZONE_STATE + z] &= 0b0111_1111
+                else:
+                    self.response[const.DAOF_ZONE_STATE + z] |= 0b1000_0000
+
+        # Position in 5% steps, 0 to 100%
+        elif byte4 in (const.CMD_4_GRP_POSINC, const.CMD_4_GRP_POSDEC):
+            step = 1 if byte4 == const.CMD_4_GRP_POSINC else -1
+            value = self.response[percent] & 0b0111_1111
+            value = min(20, max(0, value + step))
+            self.response[percent] = (self.response[percent] & 0b1000_0000
+                                        | value)
+
+    def _ac_command(self, ac_unit, byte4, byte5) -> None:
+        if ac_unit >= const.AC_UNIT_LEN:
+            return
+        if byte4 == const.CMD_4_TOGGLE:
+            self.response[const.DAOF_AC1_STATUS + ac_unit] ^= 0b1000_0000
+        elif byte4 == const.CMD_4_AC_MODE:
+            self._set_low_bits(const.DAOF_AC1_MODE + ac_unit, byte5)
+        elif byte4 == const.CMD_4_AC_FAN_SPD:
+            self._set_low_bits(const.DAOF_AC1_FAN + ac_unit, byte5)
+        elif byte4 in (const.CMD_4_AC_TEMP_INC, const.CMD_4_AC_TEMP_DEC):
+            step = 1 if byte4 == const.CMD_4_AC_TEMP_INC else -1
+            offset = const.DAOF_AC1_TEMP_SP + ac_unit
+            value = self.response[offset] & 0b0011_1111
+            value = min(const.AC_TEMP_MAX,
+                        max(const.AC_TEMP_MIN, value + step))
+            self.response[offset] = self.response[offset] & 0b1100_0000 | value
+
+    def _set_low_bits(self, offset, value) -> None:
+        self.response[offset] = (self.response[offset] & 0b1111_0000
+                                    | value & 0b0000_1111)
+
+    def _set_text(self, offset, length, text) -> None:
+        self.response[offset:offset+length] = \
+            text.encode()[:length].ljust(length, b'\x00')
+
+    async def _handle(self, reader, writer) -> None:
+        self.connections += 1
+        self._writers.add(writer)
+        self._handlers.add(asyncio.current_task())
+        try:
+            while True:
+                try:
+                    frame = await reader.readexactly(13)
+                except asyncio.IncompleteReadError:
+                    break
+                self.requests += 1
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                response = self.handle_command(frame)
+                if not response:
+                    break
+                writer.write(response)
+                await writer.drain()
+
+        # Cancelled by close, nothing waits on the handler to report it
+        except (OSError, asyncio.CancelledError):
+            pass
+        finally:
+            self.connections -= 1
+            self._writers.discard(writer)
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
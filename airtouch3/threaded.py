@@ -0,0 +1,216 @@
+import asyncio
+import copy
+import threading
+from concurrent.futures import Future
+from typing import Dict, List
+
+from airtouch3.airtouch3 import AirTouch3, AT3AcFanSpeed, AT3AcMode, \
+    AT3AcUnit, AT3Command, AT3CommandResult, AT3CommsStatus, AT3Group, \
+    AT3GroupMode, AT3Snapshot, AT3TempSensor
+from airtouch3.airtouch3async import AirTouch3Async
+from airtouch3.cache import AT3StateCache
+from airtouch3.retry import AT3CircuitBreaker, AT3CircuitState, AT3RetryPolicy
+
+_loop: asyncio.AbstractEventLoop = None
+_loop_thread: threading.Thread = None
+_loop_lock = threading.Lock()
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+
+    # One event loop thread for the whole process, started on first use,
+    # every threaded client runs its async core on it
+    global _loop, _loop_thread
+    with _loop_lock:
+        if not _loop:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=_loop.run_forever,
+                                name="airtouch3-loop", daemon=True)
+            _loop_thread.start()
+        return _loop
+
+class AirTouch3Threaded:
+    timeout = 60.0
+
+    def __init__(self, tcp_ip, retry_policy: AT3RetryPolicy = None,
+                    circuit_breaker: AT3CircuitBreaker = None,
+                    port: int = None, cache: AT3StateCache = None,
+                    timeout=60.0) -> None:
+        self.timeout = timeout
+        self.loop = _background_loop()
+
+        # Created on the loop, so its lock and tasks belong to that loop
+        async def create():
+            return AirTouch3Async(tcp_ip, retry_policy, circuit_breaker,
+                                    port, cache)
+        self.core: AirTouch3Async = self._call(create())
+
+    # State is read straight from the async core, there is only one copy
+    @property
+    def comms_status(self) -> AT3CommsStatus:
+        return self.core.comms_status
+
+    @property
+    def comms_error(self) -> str:
+        return self.core.comms_error
+
+    @property
+    def name(self) -> str:
+        return self.core.name
+
+    @property
+    def id(self) -> str:
+        return self.core.id
+
+    @property
+    def last_response(self) -> bytes:
+        return self.core.last_response
+
+    @property
+    def last_update(self) -> float:
+        return self.core.last_update
+
+    @property
+    def stale(self) -> bool:
+        return self.core.stale
+
+    @property
+    def zone_mask(self) -> int:
+        return self.core.zone_mask
+
+    @property
+    def zone_group(self) -> List[int]:
+        return self.core.zone_group
+
+    @property
+    def circuit_state(self) -> AT3CircuitState:
+        return self.core.circuit_state
+
+    # Groups and AC units are copies bound to this client, so their
+    # toggle() etc block like the sync client instead of returning
+    # coroutines
+    @property
+    def groups(self) -> Dict[int, AT3Group]:
+        return {k: self._bind(v) for k, v in self.core.groups.items()}
+
+    @property
+    def ac_units(self) -> Dict[int, AT3AcUnit]:
+        return {k: self._bind(v) for k, v in self.core.ac_units.items()}
+
+    @property
+    def sensors(self) -> Dict[str, AT3TempSensor]:
+        return {k: copy.copy(v) for k, v in self.core.sensors.items()}
+
+    def register_update_callback(self, func) -> int:
+
+        # Run by the core's dispatcher, off the event loop thread
+        return self.core.register_update_callback(func)
+
+    def unregister_update_callback(self, func) -> None:
+        self.core.unregister_update_callback(func)
+
+    def update_status(self) -> bool:
+        return self._call(self.core.update_status())
+
+    def toggle_ac_unit(self, acUnit: int) -> bool:
+        return self._call(self.core.toggle_ac_unit(acUnit))
+
+    def toggle_temperature_ac_unit(self, acUnit: int,
+                                    direction: AT3Command) -> int:
+        return self._call(self.core.toggle_temperature_ac_unit(acUnit,
+                                                                direction))
+
+    def set_fan_speed_ac_unit(self, acUnit: int,
+                                speed: AT3AcFanSpeed) -> AT3AcFanSpeed:
+        return self._call(self.core.set_fan_speed_ac_unit(acUnit, speed))
+
+    def set_mode_ac_unit(self, acUnit: int, mode: AT3AcMode) -> AT3AcMode:
+        return self._call(self.core.set_mode_ac_unit(acUnit, mode))
+
+    def toggle_group(self, group: int) -> bool:
+        return self._call(self.core.toggle_group(group))
+
+    def toggle_group_mode(self, group: int) -> AT3GroupMode:
+        return self._call(self.core.toggle_group_mode(group))
+
+    def toggle_position_group(self, group: int, direction: AT3Command) -> int:
+        return self._call(self.core.toggle_position_group(group, direction))
+
+    def ensure_group(self, group: int, is_on: bool,
+                        retries=2) -> AT3CommandResult:
+        return self._call(self.core.ensure_group(group, is_on, retries))
+
+    def ensure_group_mode(self, group: int, mode: AT3GroupMode,
+                            retries=2) -> AT3CommandResult:
+        return self._call(self.core.ensure_group_mode(group, mode, retries))
+
+    def ensure_position_group(self, group: int, percent: int,
+                                retries=2) -> AT3CommandResult:
+        return self._call(self.core.ensure_position_group(group, percent,
+                                                            retries))
+
+    def ensure_ac_unit(self, acUnit: int, is_on: bool,
+                        retries=2) -> AT3CommandResult:
+        return self._call(self.core.ensure_ac_unit(acUnit, is_on, retries))
+
+    def ensure_mode_ac_unit(self, acUnit: int, mode: AT3AcMode,
+                            retries=2) -> AT3CommandResult:
+        return self._call(self.core.ensure_mode_ac_unit(acUnit, mode,
+                                                        retries))
+
+    def ensure_fan_speed_ac_unit(self, acUnit: int, speed: AT3AcFanSpeed,
+                                    retries=2) -> AT3CommandResult:
+        return self._call(self.core.ensure_fan_speed_ac_unit(acUnit, speed,
+                                                                retries))
+
+    def ensure_temperature_ac_unit(self, acUnit: int, temperature: int,
+                                    retries=2) -> AT3CommandResult:
+        return self._call(self.core.ensure_temperature_ac_unit(acUnit,
+                                                        temperature, retries))
+
+    def print_status(self) -> None:
+        AirTouch3.print_status(self)
+
+    def snapshot(self) -> AT3Snapshot:
+        return self._call(self._snapshot())
+
+    def to_dict(self) -> dict:
+        return self.core.to_dict()
+
+    def to_json(self) -> str:
+        return self.core.to_json()
+
+    def to_bytes(self) -> bytes:
+        return self.core.to_bytes()
+
+    def zones_on(self) -> List[int]:
+        return self.core.zones_on()
+
+    def changed_zones(self, prev) -> List[int]:
+        return self.core.changed_zones(prev)
+
+    def refresh_background(self) -> Future:
+        return asyncio.run_coroutine_threadsafe(self.core.update_status(),
+                                                self.loop)
+
+    def close(self) -> None:
+        self._call(self.core.close())
+
+    async def _snapshot(self) -> AT3Snapshot:
+
+        # Taken on the loop, so a status being processed isnt half copied
+        return self.core.snapshot()
+
+    def _bind(self, entity):
+        entity = copy.copy(entity)
+        entity._at3 = self
+        return entity
+
+    def _call(self, coro):
+
+        # Blocking here on the loop thread would wait on itself forever
+        if threading.current_thread() is _loop_thread:
+            coro.close()
+            raise RuntimeError("Blocking AirTouch3Threaded call made from "
+                                "its own event loop, use the core instead")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(
+                                                                self.timeout)
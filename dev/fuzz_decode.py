@@ -0,0 +1,133 @@
+import argparse
+import os
+import random
+import sys
+import time
+import traceback
+
+# Run from a checkout, python dev/fuzz_decode.py, without installing
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import airtouch3.constants as const
+from airtouch3 import AirTouch3
+from airtouch3.simulator import SAMPLE_RESPONSES
+
+# Fields the decoder indexes with, or builds enums from, these are where a
+# corrupt frame does the most damage so they are hit more often
+FIELDS = (
+    (const.DAOF_GRP_COUNT, 1),
+    (const.DAOF_GRP_FIRSTZONE, const.GROUPS_LEN),
+    (const.DAOF_GRP_PERCENT, const.GROUPS_LEN),
+    (const.DAOF_GRP_SETPOINT, const.GROUPS_LEN),
+    (const.DAOF_GRP_NAME, const.GROUPS_LEN * const.GRP_NAME_LEN),
+    (const.DAOF_ZONE_STATE, const.ZONES_LEN),
+    (const.DAOF_AC1_STATUS, const.AC_UNIT_LEN),
+    (const.DAOF_AC1_MODE, const.AC_UNIT_LEN),
+    (const.DAOF_AC1_FAN, const.AC_UNIT_LEN),
+    (const.DAOF_AC1_NAME, const.AC_UNIT_LEN * const.AC_NAME_LEN),
+    (const.DAOF_TP_GRP_ID, 1),
+    (const.DAOF_TP_TEMP, 1),
+    (const.DAOF_TEMP_SENSORS, const.TEMP_SENSOR_LEN),
+    (const.DAOF_SYS_NAME, const.SYS_NAME_LEN),
+    (const.DAOF_SYS_ID, const.SYS_ID_LEN),
+)
+
+def mutate(rng, frame) -> bytes:
+
+    # A few changes to a sample frame, of a randomly chosen kind
+    frame = bytearray(frame)
+    for _ in range(rng.randint(1, 8)):
+        kind = rng.randrange(4)
+        if kind == 0:
+            frame[rng.randrange(len(frame))] = rng.randrange(256)
+        elif kind == 1:
+            frame[rng.randrange(len(frame))] ^= 1 << rng.randrange(8)
+        elif kind == 2:
+            offset, length = rng.choice(FIELDS)
+            frame[offset + rng.randrange(length)] = rng.choice(
+                (0, 0x0f, 0x7f, 0x80, 0xf0, 0xff, rng.randrange(256)))
+        else:
+            offset, length = rng.choice(FIELDS)
+            frame[offset:offset + length] = bytes(rng.randrange(256)
+                                                    for _ in range(length))
+    return bytes(frame)
+
+def generate(rng) -> bytes:
+
+    # Mostly mutated samples, sometimes all random or all one value
+    choice = rng.random()
+    if choice < 0.05:
+        return bytes(rng.randrange(256) for _ in range(const.RESPONSE_LEN))
+    if choice < 0.1:
+        return bytes([rng.choice((0, 0xff))]) * const.RESPONSE_LEN
+    return mutate(rng, rng.choice(SAMPLE_RESPONSES))
+
+def fuzz(frames, seed, budget) -> int:
+    rng = random.Random(seed)
+    failures = 0
+    times = []
+
+    # The one client decodes every frame, like a poll loop would, so state
+    # left behind by a bad frame is carried into the next
+    at3 = AirTouch3("fuzz")
+    for n in range(frames):
+        frame = generate(rng)
+        try:
+            start = time.perf_counter()
+            at3._process_response(frame)
+            times.append(time.perf_counter() - start)
+            str(at3.to_dict())
+        except Exception:
+            failures += 1
+            print(f"Frame {n} raised, seed {seed}: {frame.hex()}")
+            traceback.print_exc()
+
+    # Any one frame can be held up by gc or the scheduler, so the budget
+    # is for the 99th percentile rather than the slowest
+    times.sort()
+    p99 = times[int(0.99 * (len(times) - 1))] if times else 0.0
+    print(f"{frames} frames, {failures} raised, decode p50 "
+            f"{1e6 * times[len(times) // 2] if times else 0.0:.0f}us, "
+            f"p99 {1e6 * p99:.0f}us, slowest "
+            f"{1e6 * times[-1] if times else 0.0:.0f}us")
+    if p99 > budget:
+        failures += 1
+        print(f"Decode p99 over budget of {1e6 * budget:.0f}us")
+    return failures
+
+def throughput(seconds, minimum) -> bool:
+
+    # Same sample frames over and over, the cost of a normal poll
+    at3 = AirTouch3("throughput")
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for frame in SAMPLE_RESPONSES:
+            at3._process_response(frame)
+        count += len(SAMPLE_RESPONSES)
+    rate = count / (time.perf_counter() - start)
+    print(f"{rate:.0f} decodes/s, minimum {minimum:.0f}/s")
+    return rate >= minimum
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Fuzz the status frame decoder and check its throughput")
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--budget", type=float, default=1.0,
+        help="most milliseconds the 99th percentile decode may take")
+    parser.add_argument("--seconds", type=float, default=2.0,
+        help="seconds to measure throughput over")
+    parser.add_argument("--min-rate", type=float, default=10000.0,
+        help="fewest decodes per second that pass")
+    args = parser.parse_args(argv)
+
+    # Seed is printed so a failing run can be repeated
+    seed = args.seed if args.seed is not None else random.randrange(2**32)
+    print(f"Seed {seed}")
+    failures = fuzz(args.frames, seed, args.budget / 1e3)
+    fast_enough = throughput(args.seconds, args.min_rate)
+    return 0 if not failures and fast_enough else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,12 @@
+from airtouch3.profiling import profile_startup
+
+# Same default budget as python -m airtouch3 profile
+BUDGET = 50.0
+
+def test_startup() -> None:
+    profile = profile_startup(runs=3)
+    assert 1e3 * profile.import_time <= BUDGET
+
+    # Only the sync client is loaded until something else is used
+    assert "asyncio" not in profile.modules
+    assert "airtouch3.airtouch3async" not in profile.modules